@@ -8,147 +8,461 @@ Comment l'utiliser:
 python3 analyzers.py <input_file> --output <output_file> --method <method>
 
 à remplacer :
-- <input_file> par le chemin vers votre corpus au format xml, pickle ou json
-- <output_format> par le nom du fichier d'output au format xml, pickle ou json
+- <input_file> par le chemin vers votre corpus au format xml, pickle, json, jsonl ou rsscol
+- <output_format> par le nom du fichier d'output au format xml, pickle, json, jsonl ou rsscol
 - <method> par "trankit", "spacy" ou "stanza"
-)
+
+En pipe, avec le format JSON Lines (un item par ligne), les items sont annotés par paquets
+pendant que read_corpus.py parse encore les fichiers, et écrits au fur et à mesure :
+python3 read_corpus.py -o parcours -m re ../Corpus -f jsonl --stdout | python3 analyzers.py --stdin --f jsonl --stdout > annote.jsonl
 '''
 
 
 import sys
-import json
-import pickle
-import xml.etree.ElementTree as ET
-import trankit
-from trankit import Pipeline as PipelineTrankit
-import spacy
-import stanza
-from stanza import Pipeline as PipelineStanza
-from tqdm import tqdm
-from datastructures import Corpus, Token, Item, load_xml, load_json, load_pickle, save_json, save_xml, save_pickle
+from datastructures import (Corpus, Token, Item, load_xml, load_json, load_jsonl, load_pickle, load_rsscol, save_json,
+                            save_jsonl, save_xml, save_pickle, save_rsscol, iter_xml, iter_jsonl, write_xml, write_json,
+                            write_jsonl)
 from typing import List
 import argparse
 import re
+from bisect import bisect_right
+from collections import deque
+from itertools import islice, tee
 from pathlib import Path
+from cache_annotation import CacheAnnotation, TAILLE_MAX_DEFAUT
+import mesures
+
+
+
+
+SEPARATEUR_TRANKIT = "\n\n"
+
+# composants de fr_core_news_sm dont on n'utilise pas la sortie
+SPACY_EXCLUS = ["ner"]
+_nlp_spacy = None
+
 
+def charger_spacy():
+    """
+    Charge le modèle spaCy une seule fois pour tout le processus.
+    """
+    global _nlp_spacy
+    if _nlp_spacy is None:
+        import spacy
+        _nlp_spacy = spacy.load("fr_core_news_sm", exclude=SPACY_EXCLUS)
+    return _nlp_spacy
 
 
+def texte_spacy(item: Item) -> str:
+    # un flux peut avoir un item sans titre ou sans description (None)
+    return (item.title or "") + "." + (item.description or "")
 
-def annotate_spacy(item: Item) -> Item:
-    nlp = spacy.load("fr_core_news_sm")
-    texte_item = item.title + "." + item.description
-    doc = nlp(texte_item)
+
+def tokens_spacy(doc) -> List[Token]:
     annotated_tokens = []
     for token in doc:
         token_form = token.text
         token_lemma = token.lemma_
         token_pos = token.pos_
         token_gouv_lemme = token.head.lemma_
-        # print(token_gouv_lemme)
         token_gouv_pos = token.head.pos_
         token_rel = token.dep_
-        annotated_token = Token(Form=token_form, Lemma=token_lemma, POS=token_pos, Gouv_lemme=token_gouv_lemme, Gouv_pos=token_gouv_pos, Rel=token_rel)
+        annotated_token = Token(Form=token_form, Lemma=token_lemma, POS=token_pos, Gouv_lemme=token_gouv_lemme, Gouv_pos=token_gouv_pos, Rel=token_rel, Gouv_id=token.head.i)
         annotated_tokens.append(annotated_token)
-    annotated_item = Item(
+    return annotated_tokens
+
+
+def item_annote(item: Item, tokens: List[Token]) -> Item:
+    return Item(
         source=item.source,
         title=item.title,
         description=item.description,
         category=item.category,
         pubDate=item.pubDate,
-        analysis=annotated_tokens
+        analysis=tokens
     )
-    return annotated_item
+
+
+def annotate_spacy(item: Item, nlp=None) -> Item:
+    if nlp is None:
+        nlp = charger_spacy()
+    doc = nlp(texte_spacy(item))
+    return item_annote(item, tokens_spacy(doc))
+
+
+def texte_trankit(item: Item) -> str:
+    # les paragraphes vides servent de séparateur entre items dans un paquet
+    return re.sub(r"\n\s*\n", "\n", (item.title or "") + ". " + (item.description or ""))
+
+
+def tokens_phrase_trankit(sentence, decalage: int = 0) -> List[Token]:
+    """
+    Convertit une phrase Trankit en Token ; decalage est le nombre de tokens de l'item
+    déjà annotés avant cette phrase, pour calculer la position du gouverneur dans l'item.
+    """
+    tokens = []
+    # index des tokens de la phrase par id, pour retrouver le gouverneur sans reparcourir la phrase
+    par_id = {t['id']: (position, t) for position, t in enumerate(sentence.get('tokens', ''))}
+    for position_token, token in enumerate(sentence['tokens']):
+        form = token['text']
+        lemma = token.get('lemma', '')
+        pos = token.get('upos', '')
+        head = token.get('head', '')
+        head_verif = None  ##important sinon erreur variable innaccesible
+        Gouv_lemme = None  ##important sinon erreur variable innaccesible
+        Gouv_id = None
+        if head in par_id:
+            position, gouverneur = par_id[head]
+            head_verif = gouverneur.get('upos', '')  ###il faut prendre le pos
+            Gouv_lemme = gouverneur.get('lemma', '')
+            Gouv_id = decalage + position
+        elif head == 0:
+            # la racine pointe sur elle-même, comme avec spaCy et Stanza
+            head_verif = pos
+            Gouv_lemme = lemma
+            Gouv_id = decalage + position_token
+        deprel = token.get('deprel', '')
+        tokens.append(Token(Form=form, Lemma=lemma, POS=pos, Gouv_lemme=Gouv_lemme, Gouv_pos=head_verif, Rel=deprel, Gouv_id=Gouv_id))
+    return tokens
 
 
 def item_trankit(item: Item, nlp) -> Item:
-    text = item.title + ". " + item.description
-    annotations = nlp(text)
+    annotations = nlp(texte_trankit(item))
     tokens = []
     for sentence in annotations['sentences']:
-        for token in sentence['tokens']:
-            form = token['text']
-            lemma = token.get('lemma', '')
-            pos = token.get('upos', '')
-            head = token.get('head', '')
-            head_verif = None  ##important sinon erreur variable innaccesible
-            Gouv_lemme = None  ##important sinon erreur variable innaccesible
-            
-            for token___hhead in sentence.get('tokens', ''):    ## parcours de tous les head
-                if token___hhead['id'] == head: ## si id du token == [index] du gouveneur avec token head
-                    head_verif = token___hhead.get('upos', '')  ###il faut prendre le pos
-                    Gouv_lemme = token___hhead.get('lemma', '')
-            deprel = token.get('deprel', '')
-            tokens.append(Token(Form=form, Lemma=lemma, POS=pos, Gouv_lemme=Gouv_lemme, Gouv_pos=head_verif, Rel=deprel))
-    return Item(source=item.source, title=item.title, description=item.description,
-	category=item.category, pubDate=item.pubDate, analysis=tokens)
+        tokens.extend(tokens_phrase_trankit(sentence, len(tokens)))
+    return item_annote(item, tokens)
 
 
-def annotate_stanza(item: Item, nlp) -> Item:
-    text = item.title + "." + item.description
-    doc = nlp(text)
+def paquet_trankit(items: List[Item], nlp) -> List[Item]:
+    """
+    Annote un paquet d'items en un seul appel à Trankit : les textes sont concaténés
+    (séparés par un paragraphe vide) et chaque phrase est rattachée à son item
+    grâce à sa position dans le document (dspan).
+    """
+    textes = [texte_trankit(item) for item in items]
+    debuts = []
+    position = 0
+    for texte in textes:
+        debuts.append(position)
+        position += len(texte) + len(SEPARATEUR_TRANKIT)
+    annotations = nlp(SEPARATEUR_TRANKIT.join(textes))
+    tokens_par_item = [[] for _ in items]
+    for sentence in annotations['sentences']:
+        indice = bisect_right(debuts, sentence['dspan'][0]) - 1
+        tokens_par_item[indice].extend(tokens_phrase_trankit(sentence, len(tokens_par_item[indice])))
+    return [item_annote(item, tokens) for item, tokens in zip(items, tokens_par_item)]
+
+
+def texte_stanza(item: Item) -> str:
+    return (item.title or "") + "." + (item.description or "")
+
+
+def tokens_stanza(doc) -> List[Token]:
     annotated_tokens = []
     for sentence in doc.sentences:
-        for word in sentence.words:
-
-            Form=word.text,
-            Lemma=word.lemma,
-            POS=word.pos,
-            Gouv_lemme = sentence.words[word.head-1].text if word.head > 0 else word.text,
+        decalage = len(annotated_tokens)
+        for position, word in enumerate(sentence.words):
+            Form = word.text
+            Lemma = word.lemma
+            POS = word.pos
+            Gouv_lemme = sentence.words[word.head-1].text if word.head > 0 else word.text
             id_head = word.head
             head_mot = sentence.words[id_head-1]
             Gouv_pos = head_mot.pos
             Rel = word.deprel
-            annotated_token = Token(Form=Form, Lemma=Lemma, POS=POS, Gouv_lemme=Gouv_lemme, Gouv_pos=Gouv_pos, Rel=Rel)
+            Gouv_id = decalage + (word.head - 1 if word.head > 0 else position)
+            annotated_token = Token(Form=Form, Lemma=Lemma, POS=POS, Gouv_lemme=Gouv_lemme, Gouv_pos=Gouv_pos, Rel=Rel, Gouv_id=Gouv_id)
             annotated_tokens.append(annotated_token)
-    annotated_item = Item(
-        source=item.source,
-        title=item.title,
-        description=item.description,
-        category=item.category,
-        pubDate=item.pubDate,
-        analysis=annotated_tokens
-    )
-    return annotated_item
+    return annotated_tokens
 
 
-def all_items_stanza(corpus: Corpus, nlp) -> Corpus:
-    corpus_annotated = Corpus(items=[])
-    for item_list in corpus.items:
-        annotated_item_list = []
-        for item in item_list:
-            annotated_item = annotate_stanza(item, nlp)
-            annotated_item_list.append(annotated_item)
-        corpus_annotated.items.append(annotated_item_list)
-    return corpus_annotated
+def annotate_stanza(item: Item, nlp) -> Item:
+    return item_annote(item, tokens_stanza(nlp(texte_stanza(item))))
 
 
-def all_items_trankit(corpus: Corpus, nlp) -> Corpus:
-    annotated_corpus = Corpus(items=[])
-    for item_list in corpus.items:
-        annotated_item_list = [item_trankit(item, nlp) for item in item_list]
-        annotated_corpus.items.append(annotated_item_list)
-    return annotated_corpus
+def paquet_stanza(items: List[Item], nlp) -> List[Item]:
+    """
+    Annote un paquet d'items en un seul appel à Stanza (entrée multi-documents) :
+    Stanza renvoie un Document par texte, dans le même ordre.
+    """
+    import stanza
+    docs = nlp([stanza.Document([], text=texte_stanza(item)) for item in items])
+    return [item_annote(item, tokens_stanza(doc)) for item, doc in zip(items, docs)]
+
+
+def paquets(items, batch_size: int):
+    """
+    Découpe un itérable d'items en listes de batch_size items, au fur et à mesure de la lecture.
+    """
+    items = iter(items)
+    while True:
+        paquet = list(islice(items, batch_size))
+        if not paquet:
+            return
+        yield paquet
 
 
-def all_items_spacy(corpus):
+def par_paquets(corpus: Corpus, batch_size: int):
+    return paquets((item for item_list in corpus.items for item in item_list), batch_size)
+
+
+def reconstruire_corpus(corpus: Corpus, items_annotes) -> Corpus:
+    """
+    Remet les items annotés (dans l'ordre du corpus) dans la même structure de listes d'items que le corpus d'entrée.
+    """
+    items_annotes = iter(items_annotes)
     corpus_annote = Corpus(items=[])
-    for item_list in tqdm(corpus.items):
-        annotated_item_list = []
-        for item in item_list:
-            annotated_item = annotate_spacy(item)
-            annotated_item_list.append(annotated_item)
-        corpus_annote.items.append(annotated_item_list)
+    for item_list in corpus.items:
+        corpus_annote.items.append([next(items_annotes) for _ in item_list])
     return corpus_annote
 
 
+# Annotation en flux : les fonctions flux_* prennent un itérable d'items (éventuellement
+# en cours de lecture sur l'entrée standard) et renvoient les items annotés dans le même ordre,
+# paquet par paquet, sans attendre la fin de l'entrée.
+# Avec un cache (CacheAnnotation), seuls les textes absents du cache sont envoyés au modèle.
+
+def version_spacy(nlp) -> str:
+    return f"{nlp.meta.get('name')}-{nlp.meta.get('version')}"
+
+
+def version_stanza() -> str:
+    import stanza
+    return stanza.__version__
+
+
+def version_trankit() -> str:
+    import trankit
+    return getattr(trankit, "__version__", "inconnue")
+
+
+def flux_avec_cache(items, annoter, cache, annotateur: str, version: str, texte, taille_paquet: int):
+    """
+    Pour chaque paquet d'items, cherche les annotations dans le cache (un texte répété dans le
+    paquet n'est cherché qu'une fois), annote les autres avec annoter(liste d'items) et les ajoute au cache.
+    """
+    for paquet in paquets(items, taille_paquet):
+        textes = [texte(item) for item in paquet]
+        tokens = {}
+        a_annoter = []
+        for item, texte_item in zip(paquet, textes):
+            if texte_item not in tokens:
+                tokens[texte_item] = cache.get(annotateur, version, texte_item)
+                if tokens[texte_item] is None:
+                    a_annoter.append(item)
+        if a_annoter:
+            for item in annoter(a_annoter):
+                texte_item = texte(item)
+                tokens[texte_item] = item.analysis
+                cache.put(annotateur, version, texte_item, item.analysis)
+        for item, texte_item in zip(paquet, textes):
+            yield item_annote(item, tokens[texte_item])
+
+
+def flux_stanza(items, nlp, batch_size: int = 32, cache=None):
+    if cache is not None:
+        yield from flux_avec_cache(items, lambda paquet: paquet_stanza(paquet, nlp), cache,
+                                   "stanza", version_stanza(), texte_stanza, batch_size)
+        return
+    for paquet in paquets(items, batch_size):
+        yield from paquet_stanza(paquet, nlp)
+
+
+def flux_trankit(items, nlp, batch_size: int = 32, cache=None):
+    if cache is not None:
+        yield from flux_avec_cache(items, lambda paquet: paquet_trankit(paquet, nlp), cache,
+                                   "trankit", version_trankit(), texte_trankit, batch_size)
+        return
+    for paquet in paquets(items, batch_size):
+        yield from paquet_trankit(paquet, nlp)
+
+
+def flux_spacy(items, nlp=None, batch_size: int = 64, n_process: int = 1, cache=None):
+    if nlp is None:
+        nlp = charger_spacy()
+    if cache is not None:
+        # un appel à nlp.pipe par paquet d'items absents du cache : avec n_process > 1, spaCy lancerait
+        # et arrêterait un pool de processus à chaque paquet. Le chemin avec cache reste donc dans ce
+        # processus (pour plusieurs processus, utiliser --workers, qui partage le même cache)
+        yield from flux_avec_cache(items, lambda paquet: flux_spacy(paquet, nlp, batch_size, 1), cache,
+                                   "spacy", version_spacy(nlp), texte_spacy, batch_size)
+        return
+    # nlp.pipe consomme les textes par paquets de batch_size : items est lu au même rythme
+    items, textes = tee(items)
+    docs = nlp.pipe((texte_spacy(item) for item in textes), batch_size=batch_size, n_process=n_process)
+    for item, doc in zip(items, docs):
+        yield item_annote(item, tokens_spacy(doc))
+
+
+def annoter_listes(item_lists, annoter, batch_size: int, n_process: int, cache=None):
+    """
+    Annote un flux de listes d'items avec une des fonctions de ANNOTATEURS et renvoie
+    les listes annotées une par une, dès que tous leurs items sont annotés.
+    """
+    tailles = deque()
+
+    def items():
+        for item_list in item_lists:
+            tailles.append(len(item_list))
+            yield from item_list
+
+    courante = []
+    for item in annoter(items(), batch_size, n_process, cache):
+        # la taille de la liste de l'item est déjà connue : items() l'a lue avant de le renvoyer
+        while not courante and tailles[0] == 0:
+            tailles.popleft()
+            yield []
+        courante.append(item)
+        if len(courante) == tailles[0]:
+            tailles.popleft()
+            yield courante
+            courante = []
+    for _ in tailles:
+        yield []
+
+
+def all_items_stanza(corpus: Corpus, nlp, batch_size: int = 32, cache=None) -> Corpus:
+    annotes = flux_stanza((item for item_list in corpus.items for item in item_list), nlp, batch_size, cache)
+    return reconstruire_corpus(corpus, annotes)
+
+
+def all_items_trankit(corpus: Corpus, nlp, batch_size: int = 32, cache=None) -> Corpus:
+    annotes = flux_trankit((item for item_list in corpus.items for item in item_list), nlp, batch_size, cache)
+    return reconstruire_corpus(corpus, annotes)
+
+
+def all_items_spacy(corpus: Corpus, nlp=None, batch_size: int = 64, n_process: int = 1, cache=None) -> Corpus:
+    """
+    Annote tout le corpus en faisant passer les textes par paquets dans nlp.pipe,
+    avec un modèle chargé une seule fois.
+    """
+    from tqdm import tqdm
+    items = [item for item_list in corpus.items for item in item_list]
+    annotes = flux_spacy(items, nlp, batch_size, n_process, cache)
+    return reconstruire_corpus(corpus, tqdm(annotes, total=len(items)))
+
+
+# Les bibliothèques d'annotation sont lourdes à importer : elles ne sont importées
+# que par la méthode choisie, au moment de l'annotation.
+
+def charger_stanza():
+    from stanza import Pipeline as PipelineStanza
+    return PipelineStanza('fr')
+
+
+def charger_trankit():
+    from trankit import Pipeline as PipelineTrankit
+    return PipelineTrankit('french')
+
+
+def annoter_spacy(items, batch_size: int, n_process: int, cache=None):
+    from tqdm import tqdm
+    return tqdm(flux_spacy(items, batch_size=batch_size, n_process=n_process, cache=cache))
+
+
+def annoter_stanza(items, batch_size: int, n_process: int, cache=None):
+    return flux_stanza(items, charger_stanza(), batch_size=batch_size, cache=cache)
+
+
+def annoter_trankit(items, batch_size: int, n_process: int, cache=None):
+    return flux_trankit(items, charger_trankit(), batch_size=batch_size, cache=cache)
+
+
+ANNOTATEURS = {
+    "spacy": annoter_spacy,
+    "stanza": annoter_stanza,
+    "trankit": annoter_trankit,
+}
+
+
+# Annotation sur plusieurs processus (--workers) : chaque processus charge le modèle une seule fois
+# (initializer) puis annote des listes d'items entières ; le processus principal garde l'ordre du
+# corpus, consulte le cache et tient une barre de progression commune.
+
+CHARGEURS = {"spacy": charger_spacy, "stanza": charger_stanza, "trankit": charger_trankit}
+FLUX = {"spacy": flux_spacy, "stanza": flux_stanza, "trankit": flux_trankit}
+TEXTES = {"spacy": texte_spacy, "stanza": texte_stanza, "trankit": texte_trankit}
+
+_methode_worker = None
+_nlp_worker = None
+
+
+def _init_worker(methode: str) -> None:
+    global _methode_worker, _nlp_worker
+    _methode_worker = methode
+    _nlp_worker = CHARGEURS[methode]()
+
+
+def version_modele(methode: str, nlp) -> str:
+    if methode == "spacy":
+        return version_spacy(nlp)
+    elif methode == "stanza":
+        return version_stanza()
+    return version_trankit()
+
+
+def _version_worker() -> str:
+    return version_modele(_methode_worker, _nlp_worker)
+
+
+def _annoter_worker(args) -> List[Item]:
+    items, batch_size = args
+    return list(FLUX[_methode_worker](items, _nlp_worker, batch_size))
+
+
+def annoter_en_parallele(item_lists, methode: str, workers: int, batch_size: int, cache=None, total=None):
+    """
+    Répartit les listes d'items entre workers processus et renvoie les listes annotées dans l'ordre du corpus.
+    Les listes sont lues par fenêtres de 4 listes par processus : la mémoire ne dépend pas de la taille du corpus.
+    Dans une fenêtre, un texte déjà présent dans le cache ou dans une liste précédente n'est pas renvoyé au modèle.
+    """
+    from multiprocessing import Pool
+    from tqdm import tqdm
+    texte = TEXTES[methode]
+    item_lists = iter(item_lists)
+    with Pool(processes=workers, initializer=_init_worker, initargs=(methode,)) as pool, \
+            tqdm(total=total, unit="item") as barre:
+        version = pool.apply(_version_worker) if cache is not None else None
+        while True:
+            fenetre = list(islice(item_lists, workers * 4))
+            if not fenetre:
+                return
+            tokens = {}
+            taches = []
+            for item_list in fenetre:
+                a_annoter = []
+                for item in item_list:
+                    texte_item = texte(item)
+                    if texte_item not in tokens:
+                        tokens[texte_item] = cache.get(methode, version, texte_item) if cache is not None else None
+                        if tokens[texte_item] is None:
+                            a_annoter.append(item)
+                taches.append((a_annoter, batch_size))
+            # imap renvoie les résultats dans l'ordre des listes : un texte est toujours annoté
+            # dans la tâche de sa première liste, donc avant d'être utilisé par les suivantes
+            for item_list, annotes in zip(fenetre, pool.imap(_annoter_worker, taches)):
+                for item in annotes:
+                    texte_item = texte(item)
+                    tokens[texte_item] = item.analysis
+                    if cache is not None:
+                        cache.put(methode, version, texte_item, item.analysis)
+                yield [item_annote(item, tokens[texte(item)]) for item in item_list]
+                barre.update(len(item_list))
+
+
 def load_corpus(file_path):
     file_extension = Path(file_path).suffix.lower()
     if file_extension == '.json':
         return load_json(file_path)
+    elif file_extension == '.jsonl':
+        return load_jsonl(file_path)
     elif file_extension == '.xml':
         return load_xml(file_path)
     elif file_extension == '.pkl':
         return load_pickle(file_path)
+    elif file_extension == '.rsscol':
+        return load_rsscol(file_path)
     else:
         raise ValueError("Le format n'est pas correct\n")
 
@@ -157,62 +471,117 @@ def save_corpus(corpus, output_file):
     file_extension = Path(output_file).suffix.lower()
     if file_extension == '.json':
         save_json(corpus, output_file)
+    elif file_extension == '.jsonl':
+        save_jsonl(corpus, output_file)
     elif file_extension == '.xml':
         save_xml(corpus, output_file)
     elif file_extension == '.pkl':
         save_pickle(corpus, output_file)
+    elif file_extension == '.rsscol':
+        save_rsscol(corpus, output_file)
     else:
         raise ValueError("Le format n'est pas correct\n")
 
 
+def iter_corpus(file_path):
+    """
+    Renvoie les listes d'items du corpus une par une : xml et jsonl sont lus au fil de l'eau,
+    les autres formats sont chargés en entier.
+    """
+    file_extension = Path(file_path).suffix.lower()
+    if file_extension == '.xml':
+        return iter_xml(file_path)
+    elif file_extension == '.jsonl':
+        return iter_jsonl(file_path)
+    return load_corpus(file_path).items
+
+
+ECRITURES_FLUX = {
+    '.xml': write_xml,
+    '.json': write_json,
+    '.jsonl': write_jsonl,
+}
+
+
+def save_flux(item_lists, output_file) -> None:
+    """
+    Écrit les listes annotées au fur et à mesure pour xml, json et jsonl ; pkl et rsscol ont besoin du corpus entier.
+    """
+    ecrire = ECRITURES_FLUX.get(Path(output_file).suffix.lower())
+    if ecrire is None:
+        save_corpus(Corpus(items=list(item_lists)), output_file)
+        return
+    with open(output_file, "w", encoding="utf-8") as sortie:
+        ecrire(item_lists, sortie)
+
+
+def compter_items(item_lists):
+    for item_list in item_lists:
+        mesures.compter("items_annotes", len(item_list))
+        yield item_list
+
+
 def main():
     parser = argparse.ArgumentParser(description='Annote un corpus selon la méthode choisie')
     parser.add_argument('--file', type=str, help='Fichier contenant le corpus.', required=False)
     parser.add_argument("--output", default='ex.json', help="Choix du nom de fichier créé pour la sauvegarde du corpus filtré.")
     parser.add_argument("--method", default='spacy', help="Méthode d'annotation à utiliser (trankit, stanza ou spacy)")
-    parser.add_argument("--stdin", action='store_true', help="ok")
-    parser.add_argument("--f", choices=['xml','json','pkl'], help="ok.")
+    parser.add_argument("--stdin", action='store_true', help="Lit le corpus sur l'entrée standard (format donné par --f)")
+    parser.add_argument("--f", choices=['xml','json','jsonl','pkl'], help="Format du corpus lu sur l'entrée standard (xml et jsonl sont annotés pendant la lecture)")
+    parser.add_argument("--stdout", action='store_true', help="Écrit les items annotés en JSON Lines sur la sortie standard, au fur et à mesure")
+    parser.add_argument("--batch-size", dest="batch_size", type=int, default=64, help="Nombre d'items envoyés ensemble au modèle (spacy, stanza, trankit)")
+    parser.add_argument("--n-process", dest="n_process", type=int, default=1, help="Nombre de processus pour nlp.pipe (spacy ; ignoré avec --cache, utiliser --workers)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Nombre de processus d'annotation, chacun avec son modèle (spacy, stanza, trankit)")
+    parser.add_argument("--cache", type=str, required=False, help="Base sqlite du cache d'annotation : les textes déjà annotés ne repassent pas par le modèle")
+    parser.add_argument("--cache-taille", dest="cache_taille", type=int, default=TAILLE_MAX_DEFAUT, help="Nombre maximal d'annotations gardées dans le cache (les moins récemment utilisées sont supprimées)")
+    parser.add_argument("--rebuild-cache", dest="rebuild_cache", action='store_true', help="Vide le cache d'annotation avant l'annotation")
+    parser.add_argument("--metriques", type=str, required=False, help="Fichier JSON du rapport de mesures (durée des étapes, compteurs), '-' pour la sortie d'erreur")
+    parser.add_argument("--profile", action='store_true', help="Ajoute au rapport de mesures un profil cProfile et tracemalloc")
     args = parser.parse_args()
+    if args.metriques or args.profile:
+        mesures.activer(args.metriques, args.profile)
 
     if args.file:
-        xml_pattern = r'\.xml$'
-        json_pattern = r'\.json$'
-        pickle_pattern = r'\.pkl$'
-        if re.search(xml_pattern, corpus):
-            corpus = load_xml(corpus)
-        elif re.search(json_pattern, corpus):
-            corpus = load_json(corpus)
-        elif re.search(pickle_pattern, corpus):
-            corpus = load_pickle(corpus)
-        else:
-            print("Format non reconnu")
+        item_lists = iter_corpus(args.file)
 
     elif args.stdin:
         if args.f == 'xml':
-            corpus = load_xml(sys.stdin)
+            item_lists = iter_xml(sys.stdin)
+        elif args.f == 'jsonl':
+            item_lists = iter_jsonl(sys.stdin)
         elif args.f == 'json':
-            corpus = load_json(sys.stdin)
+            item_lists = load_json(sys.stdin).items
         elif args.f == 'pkl':
-            corpus = load_pickle(sys.stdin)
+            item_lists = load_pickle(sys.stdin).items
         else:
             print("Format non reconnu")
+            return
 
-
-    if args.method == 'trankit':
-        nlp = PipelineTrankit('french')
-        corpus_annote = all_items_trankit(corpus, nlp)
-    elif args.method == 'spacy':
-        corpus_annote = all_items_spacy(corpus)
-    elif args.method == 'stanza':
-        nlp = PipelineStanza('fr')
-        corpus_annote = all_items_stanza(corpus, nlp)
     else:
-        print("Méthode d'annotation non reconnue")
+        print("Il faut indiquer --file ou --stdin")
         return
 
-    if args.output:
-        output_file = args.output
-        save_corpus(corpus_annote, output_file)
+    annoter = ANNOTATEURS.get(args.method)
+    if annoter is None:
+        print("Méthode d'annotation non reconnue")
+        return
+    # la lecture est en flux : son temps est compté au fur et à mesure, à l'intérieur de l'annotation
+    item_lists = mesures.flux("chargement", item_lists)
+    cache = CacheAnnotation(args.cache, args.cache_taille, args.rebuild_cache) if args.cache else None
+    try:
+        if args.workers > 1:
+            annotes = annoter_en_parallele(item_lists, args.method, args.workers, args.batch_size, cache)
+        else:
+            annotes = annoter_listes(item_lists, annoter, args.batch_size, args.n_process, cache)
+        annotes = compter_items(mesures.flux("annotation", annotes))
+        with mesures.etape("ecriture"):
+            if args.stdout:
+                write_jsonl(annotes, sys.stdout)
+            elif args.output:
+                save_flux(annotes, args.output)
+    finally:
+        if cache is not None:
+            cache.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,155 @@
+import datetime
+import sqlite3
+import sys
+from collections import Counter
+from typing import List, Tuple
+from datastructures import Corpus, Patron, SpecPatron
+from patterns import compile_specs, extraire
+from rss_parcours import empreinte_item, jour_pubdate
+
+"""
+Base persistante des comptes de patrons (sqlite).
+Au lieu de recompter tout le corpus annoté à chaque lancement, patterns.py y ajoute les comptes
+des nouveaux corpus (deltas) :
+- un item déjà compté (même source, titre et date : les snapshots se répètent) n'est pas recompté
+- les comptes sont gardés par patron, source et jour de publication, et le total de chaque patron
+  est tenu à jour, pour répondre aux requêtes top-N (par type de patron, source, dates) sans relire le corpus
+"""
+
+CHAMPS_PATRON = ["dep_lemme", "dep_pos", "gouv1_lemme", "gouv1_pos", "role1", "gouv2_lemme", "gouv2_pos", "role2"]
+
+
+def types_patrons(specs: List[SpecPatron]) -> dict:
+    """
+    Table (pos du dépendant, relation, pos du gouverneur, relation du gouverneur, pos du gouverneur du gouverneur)
+    -> nom du patron : un Patron extrait ne garde pas le nom de la spec qui l'a produit.
+    """
+    # mêmes valeurs que celles écrites par extraire : role2 vaut '' pour un patron à un seul niveau,
+    # même si la spec donne gouv1_rel
+    return {(spec.dep_pos, spec.dep_rel, spec.gouv1_pos, (spec.gouv1_rel or "") if spec.gouv2_pos else "",
+             spec.gouv2_pos or ""): spec.nom
+            for spec in specs}
+
+
+def type_patron(patron: Patron, types: dict) -> str:
+    return types.get((patron.dep_pos, patron.role1, patron.gouv1_pos, patron.role2, patron.gouv2_pos), "")
+
+
+def echapper_like(texte: str) -> str:
+    return texte.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class BasePatrons:
+    def __init__(self, chemin_base: str, reconstruire: bool = False):
+        self.connexion = sqlite3.connect(chemin_base)
+        # LOWER de sqlite ne traite que l'ASCII : les sources sont mises en minuscules comme en Python
+        self.connexion.create_function("minuscules", 1, lambda texte: texte.lower(), deterministic=True)
+        if reconstruire:
+            for table in ("comptes", "patrons", "items_comptes"):
+                self.connexion.execute(f"DROP TABLE IF EXISTS {table}")
+        self.connexion.executescript(
+            "CREATE TABLE IF NOT EXISTS patrons ("
+            "id INTEGER PRIMARY KEY, type TEXT NOT NULL, "
+            + ", ".join(f"{champ} TEXT NOT NULL" for champ in CHAMPS_PATRON)
+            + ", total INTEGER NOT NULL DEFAULT 0, UNIQUE (" + ", ".join(CHAMPS_PATRON) + "));"
+            "CREATE INDEX IF NOT EXISTS patrons_total ON patrons (type, total);"
+            "CREATE TABLE IF NOT EXISTS comptes ("
+            "patron INTEGER NOT NULL, source TEXT NOT NULL, jour TEXT NOT NULL, compte INTEGER NOT NULL, "
+            "PRIMARY KEY (patron, source, jour));"
+            "CREATE INDEX IF NOT EXISTS comptes_jour ON comptes (jour);"
+            "CREATE INDEX IF NOT EXISTS comptes_source ON comptes (source);"
+            "CREATE TABLE IF NOT EXISTS items_comptes (empreinte TEXT PRIMARY KEY);"
+        )
+
+    def fusionner(self, corpus: Corpus, specs: List[SpecPatron]) -> Tuple[int, int]:
+        """
+        Ajoute à la base les patrons des items du corpus qui n'y ont pas encore été comptés.
+        Renvoie (nombre d'items nouveaux, nombre d'occurrences de patrons ajoutées).
+        """
+        table = compile_specs(specs)
+        types = types_patrons(specs)
+        delta = Counter()
+        empreintes = set()
+        for item_list in corpus.items:
+            for item in item_list:
+                empreinte = empreinte_item(item)
+                deja_compte = self.connexion.execute(
+                    "SELECT 1 FROM items_comptes WHERE empreinte = ?", (empreinte,)).fetchone()
+                if deja_compte or empreinte in empreintes:
+                    continue
+                empreintes.add(empreinte)
+                jour = jour_pubdate(item.pubDate, item.source)
+                jour = datetime.date.fromordinal(jour).isoformat() if jour is not None else ""
+                for patron in extraire(item, table):
+                    delta[(patron, str(item.source or ""), jour)] += 1
+        self._ecrire_delta(delta, types, empreintes)
+        return len(empreintes), sum(delta.values())
+
+    def _ecrire_delta(self, delta: Counter, types: dict, empreintes: set) -> None:
+        with self.connexion:
+            ids = {}
+            totaux = Counter()
+            for (patron, source, jour), compte in delta.items():
+                identifiant = ids.get(patron)
+                if identifiant is None:
+                    valeurs = tuple(getattr(patron, champ) or "" for champ in CHAMPS_PATRON)
+                    self.connexion.execute(
+                        "INSERT OR IGNORE INTO patrons (type, " + ", ".join(CHAMPS_PATRON) + ") VALUES ("
+                        + ", ".join("?" * (len(CHAMPS_PATRON) + 1)) + ")", (type_patron(patron, types),) + valeurs)
+                    identifiant = ids[patron] = self.connexion.execute(
+                        "SELECT id FROM patrons WHERE " + " AND ".join(f"{champ} = ?" for champ in CHAMPS_PATRON),
+                        valeurs).fetchone()[0]
+                totaux[identifiant] += compte
+                self.connexion.execute(
+                    "INSERT INTO comptes VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (patron, source, jour) DO UPDATE SET compte = compte + excluded.compte",
+                    (identifiant, source, jour, compte))
+            self.connexion.executemany("UPDATE patrons SET total = total + ? WHERE id = ?",
+                                       ((total, identifiant) for identifiant, total in totaux.items()))
+            self.connexion.executemany("INSERT OR IGNORE INTO items_comptes VALUES (?)",
+                                       ((empreinte,) for empreinte in empreintes))
+
+    def meilleurs(self, k: int = 0, type_patron: str = "", source: str = "",
+                  date_debut: str = "", date_fin: str = "") -> List[Tuple[Patron, int]]:
+        """
+        Renvoie les k patrons les plus fréquents (tous si k vaut 0 ; à égalité, dans l'ordre des champs),
+        éventuellement d'un seul type, d'une source (contenue dans le nom du flux, sans tenir compte
+        de la casse) ou publiés entre deux dates (AAAA-MM-JJ).
+        """
+        champs = ", ".join(f"p.{champ}" for champ in CHAMPS_PATRON)
+        conditions = []
+        parametres = []
+        if type_patron:
+            conditions.append("p.type = ?")
+            parametres.append(type_patron)
+        if source or date_debut or date_fin:
+            # comptes détaillés : somme par patron sur les (source, jour) demandés
+            if source:
+                # % et _ de la source demandée sont pris littéralement, comme dans ReglesFiltres.source_ok
+                conditions.append("minuscules(c.source) LIKE ? ESCAPE '\\'")
+                parametres.append("%" + echapper_like(source.lower()) + "%")
+            if date_debut:
+                conditions.append("c.jour >= ?")
+                parametres.append(date_debut)
+            if date_fin:
+                conditions.append("c.jour <= ? AND c.jour != ''")
+                parametres.append(date_fin)
+            requete = (f"SELECT {champs}, SUM(c.compte) AS n FROM comptes c JOIN patrons p ON p.id = c.patron "
+                       f"WHERE {' AND '.join(conditions)} GROUP BY c.patron ORDER BY n DESC, {champs}")
+        else:
+            # totaux tenus à jour à chaque fusion
+            requete = f"SELECT {champs}, p.total AS n FROM patrons p"
+            if conditions:
+                requete += f" WHERE {' AND '.join(conditions)}"
+            requete += f" ORDER BY n DESC, {champs}"
+        if k:
+            requete += f" LIMIT {int(k)}"
+        return [(Patron(*ligne[:-1]), ligne[-1]) for ligne in self.connexion.execute(requete, parametres)]
+
+    def close(self) -> None:
+        self.connexion.commit()
+        self.connexion.close()
+
+
+def rapport_fusion(nb_items: int, nb_patrons: int) -> None:
+    print(f"base de patrons : {nb_items} items nouveaux, {nb_patrons} occurrences de patrons ajoutées", file=sys.stderr)
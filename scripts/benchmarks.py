@@ -0,0 +1,683 @@
+# -*- coding: utf-8 -*-
+'''
+Mesures de performance des différentes étapes de la chaîne de traitement.
+
+Comment l'utiliser:
+python3 benchmarks.py spacy <corpus> [--n 200] [--batch-size 64]
+python3 benchmarks.py memoire_xml <corpus>
+python3 benchmarks.py formats <corpus>
+python3 benchmarks.py patterns <corpus_annote>
+python3 benchmarks.py readers <dossier_corpus>
+python3 benchmarks.py memoire_corpus <corpus_annote>
+python3 benchmarks.py workers <corpus> [--method trankit] [--n 0] [--batch-size 32]
+python3 benchmarks.py demarrage [--limite-ms 300]
+python3 benchmarks.py generer <dossier> [--jours 7] [--snapshots 2] [--flux 20] [--items-par-flux 25]
+python3 benchmarks.py suite [--jours 7] [--flux 20] [--items-par-flux 25] [--repetitions 3] [--json resultats.json] [--comparer ancien.json]
+
+- <corpus> : un corpus sauvegardé (xml, json, jsonl, pkl ou rsscol) par read_corpus.py ou analyzers.py
+- <dossier_corpus> : une arborescence de flux RSS (par exemple ../Corpus)
+
+La suite génère une arborescence synthétique (generer_corpus) et mesure, sur ce corpus, les lecteurs
+de rss_reader, les filtres, chaque format de sauvegarde, all_patterns et les adaptateurs
+d'annotation (avec un modèle factice). Les résultats sont écrits en JSON ; avec --comparer,
+les mesures sont comparées à celles d'un lancement précédent.
+'''
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import List
+from datastructures import Corpus, Item
+
+
+def premiers_items(corpus: Corpus, n: int) -> List[Item]:
+    items = [item for item_list in corpus.items for item in item_list]
+    return items[:n] if n else items
+
+
+def chrono(fonction, *args, **kwargs):
+    """
+    Renvoie (résultat, durée en secondes) de l'appel fonction(*args, **kwargs).
+    """
+    debut = time.perf_counter()
+    resultat = fonction(*args, **kwargs)
+    return resultat, time.perf_counter() - debut
+
+
+def bench_spacy(corpus: Corpus, n: int, batch_size: int, n_process: int) -> dict:
+    """
+    Compare l'ancienne annotation spaCy (modèle rechargé pour chaque item) à la
+    nouvelle (modèle chargé une fois, textes envoyés par paquets dans nlp.pipe).
+    """
+    import spacy
+    import analyzers
+
+    items = premiers_items(corpus, n)
+
+    def ancienne_methode():
+        annotes = []
+        for item in items:
+            nlp = spacy.load("fr_core_news_sm")
+            annotes.append(analyzers.tokens_spacy(nlp(analyzers.texte_spacy(item))))
+        return annotes
+
+    anciens, duree_avant = chrono(ancienne_methode)
+    nouveau_corpus, duree_apres = chrono(analyzers.all_items_spacy, Corpus(items=[items]),
+                                         batch_size=batch_size, n_process=n_process)
+    nouveaux = [item.analysis for item in nouveau_corpus.items[0]]
+    return {
+        "items": len(items),
+        "avant_items_par_s": len(items) / duree_avant,
+        "apres_items_par_s": len(items) / duree_apres,
+        "acceleration": duree_avant / duree_apres,
+        "sorties_identiques": anciens == nouveaux,
+    }
+
+
+def pic_memoire(fonction, *args, **kwargs) -> int:
+    """
+    Renvoie le pic de mémoire allouée (en octets) pendant l'appel fonction(*args, **kwargs).
+    """
+    tracemalloc.start()
+    try:
+        fonction(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memoire_xml(corpus: Corpus, facteurs=(1, 2, 4, 8)) -> dict:
+    """
+    Écrit puis relit en flux le corpus répété facteur fois : le pic mémoire de
+    write_xml et de iter_xml doit rester à peu près constant quand le corpus grossit.
+    """
+    from datastructures import write_xml, iter_xml
+
+    resultats = {}
+    for facteur in facteurs:
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, "corpus.xml")
+
+            def ecriture():
+                with open(chemin, "w", encoding="utf-8") as sortie:
+                    write_xml((item_list for _ in range(facteur) for item_list in corpus.items), sortie)
+
+            def lecture():
+                for _ in iter_xml(chemin):
+                    pass
+
+            pic_ecriture = pic_memoire(ecriture)
+            pic_lecture = pic_memoire(lecture)
+            resultats[f"x{facteur}"] = {
+                "taille_fichier": os.path.getsize(chemin),
+                "pic_ecriture": pic_ecriture,
+                "pic_lecture": pic_lecture,
+            }
+    return resultats
+
+
+def memoire_retenue(fonction, *args, **kwargs) -> int:
+    """
+    Renvoie la mémoire (en octets) encore allouée après l'appel, tant que son résultat est gardé.
+    """
+    tracemalloc.start()
+    try:
+        resultat = fonction(*args, **kwargs)
+        taille = tracemalloc.get_traced_memory()[0]
+        del resultat
+        return taille
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memoire_corpus(chemin: str) -> dict:
+    """
+    Mémoire occupée par un corpus annoté chargé :
+    - "ancien" : dataclasses avec __dict__ et une chaîne par champ et par token, comme avant slots et interning
+    - "slots" : Item et Token à slots, chaînes répétées internées (ce que renvoient les chargeurs)
+    - "vues" : tokens en colonnes, item.analysis est une VueTokens (compacter, ou load_rsscol)
+    """
+    import dataclasses
+    import analyzers
+    import datastructures
+
+    ItemAncien = dataclasses.make_dataclass("ItemAncien", [f.name for f in dataclasses.fields(Item)])
+    TokenAncien = dataclasses.make_dataclass("TokenAncien", [f.name for f in dataclasses.fields(datastructures.Token)])
+
+    def copie(chaine):
+        # une nouvelle chaîne à chaque fois, comme en sortie de json.load ou d'ElementTree
+        return chaine[:1] + chaine[1:] if isinstance(chaine, str) else chaine
+
+    def ancien():
+        corpus = analyzers.load_corpus(chemin)
+        return [[ItemAncien(copie(item.source), item.title, item.description,
+                            [copie(cat) for cat in item.category or []], copie(item.pubDate),
+                            [TokenAncien(*(copie(getattr(token, f)) for f in datastructures.COLONNES_TOKEN), token.Gouv_id)
+                             for token in item.analysis or []])
+                 for item in item_list] for item_list in corpus.items]
+
+    corpus = analyzers.load_corpus(chemin)
+    nb_tokens = sum(len(item.analysis or []) for item_list in corpus.items for item in item_list)
+    del corpus
+    resultats = {"nb_tokens": nb_tokens}
+    for nom, chargement in [("ancien", ancien),
+                            ("slots", lambda: analyzers.load_corpus(chemin)),
+                            ("vues", lambda: datastructures.compacter(analyzers.load_corpus(chemin)))]:
+        taille = memoire_retenue(chargement)
+        resultats[nom] = {"octets": taille, "octets_par_token": taille / max(nb_tokens, 1)}
+    return resultats
+
+
+def bench_formats(corpus: Corpus) -> dict:
+    """
+    Compare la taille sur disque et les temps de sauvegarde et de chargement des formats xml, json, jsonl, pkl et rsscol.
+    """
+    import datastructures
+
+    formats = {
+        "xml": (datastructures.save_xml, datastructures.load_xml),
+        "json": (datastructures.save_json, datastructures.load_json),
+        "jsonl": (datastructures.save_jsonl, datastructures.load_jsonl),
+        "pkl": (datastructures.save_pickle, datastructures.load_pickle),
+        "rsscol": (datastructures.save_rsscol, datastructures.load_rsscol),
+    }
+    resultats = {}
+    with tempfile.TemporaryDirectory() as dossier:
+        for extension, (sauvegarde, chargement) in formats.items():
+            chemin = os.path.join(dossier, "corpus." + extension)
+            _, duree_sauvegarde = chrono(sauvegarde, corpus, chemin)
+            _, duree_chargement = chrono(chargement, chemin)
+            resultats[extension] = {
+                "taille": os.path.getsize(chemin),
+                "sauvegarde_s": duree_sauvegarde,
+                "chargement_s": duree_chargement,
+            }
+    return resultats
+
+
+def bench_patterns(corpus: Corpus) -> dict:
+    """
+    Mesure all_patterns avec la résolution des gouverneurs par position (Gouv_id) puis,
+    sur une copie sans Gouv_id, avec la résolution par forme des anciens corpus.
+    """
+    import copy
+    from patterns import all_patterns
+
+    sans_gouv_id = copy.deepcopy(corpus)
+    for item_list in sans_gouv_id.items:
+        for item in item_list:
+            for token in item.analysis or []:
+                token.Gouv_id = None
+    nb_items = sum(len(item_list) for item_list in corpus.items)
+    patrons, duree_position = chrono(all_patterns, corpus)
+    _, duree_forme = chrono(all_patterns, sans_gouv_id)
+    return {
+        "items": nb_items,
+        "patrons": len(patrons),
+        "par_position_items_par_s": nb_items / duree_position,
+        "par_forme_items_par_s": nb_items / duree_forme,
+    }
+
+
+def bench_workers(corpus: Corpus, methode: str, n: int, batch_size: int, nb_workers=(1, 2, 4, 8)) -> dict:
+    """
+    Annote les n premiers items avec annoter_en_parallele pour chaque nombre de processus
+    (chargement des modèles compris) et vérifie que la sortie ne dépend pas du nombre de processus.
+    """
+    import analyzers
+
+    items = premiers_items(corpus, n)
+    # on garde des listes d'items : c'est l'unité répartie entre les processus
+    item_lists = []
+    reste = len(items)
+    for item_list in corpus.items:
+        if reste <= 0:
+            break
+        item_lists.append(item_list[:reste])
+        reste -= len(item_lists[-1])
+    resultats = {}
+    reference = None
+    for workers in nb_workers:
+        annotes, duree = chrono(lambda: list(analyzers.annoter_en_parallele(item_lists, methode, workers, batch_size)))
+        if reference is None:
+            reference = annotes
+        resultats[f"{workers}_workers"] = {
+            "items_par_s": len(items) / duree,
+            "sorties_identiques": annotes == reference,
+        }
+    return resultats
+
+
+def bench_readers(dossier: str, methodes=("re", "et", "it", "fp")) -> dict:
+    """
+    Parse tous les fichiers de l'arborescence avec chacune des méthodes de rss_reader.
+    """
+    import rss_parcours
+
+    fichiers = rss_parcours.load_corpus(dossier)
+    resultats = {}
+    for methode in methodes:
+        try:
+            corpus, duree = chrono(lambda: [rss_parcours.parse_file(f, methode) for f in fichiers])
+        except ImportError as erreur:
+            resultats[methode] = {"erreur": str(erreur)}
+            continue
+        nb_items = sum(len(items) for items in corpus)
+        resultats[methode] = {
+            "fichiers_par_s": len(fichiers) / duree,
+            "items_par_s": nb_items / duree,
+            "items": nb_items,
+        }
+    return resultats
+
+
+# Arborescence synthétique, même organisation que ../Corpus : MM/DD/<jour>.<date>.<heure>/<flux>.xml
+
+JOURS_SEMAINE = ["lun", "mar", "mer", "jeu", "ven", "sam", "dim"]
+JOURS_RFC822 = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+MOIS_RFC822 = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+SOURCES = ["BFM BUSINESS", "Le Monde", "Blast", "Elucid", "France Info"]
+RUBRIQUES = ["Politique", "Economie", "Sport", "Culture", "Sciences", "International", "Consommation", "Emploi"]
+MOTS = ("le la les un une des du de en au sur pour avec dans par gouvernement ministre projet loi réforme "
+        "entreprise salariés marché prix hausse baisse match équipe victoire saison film festival livre "
+        "chercheurs étude climat énergie ville région pays élection président accord crise annonce").split()
+
+
+def phrase(alea: random.Random, nb_mots: int) -> str:
+    mots = [alea.choice(MOTS) for _ in range(nb_mots)]
+    return " ".join(mots).capitalize()
+
+
+def date_rfc822(moment: datetime.datetime, alea: random.Random) -> str:
+    # les deux fuseaux rencontrés dans le corpus réel
+    fuseau = alea.choice(["GMT", "+0100"])
+    return (f"{JOURS_RFC822[moment.weekday()]}, {moment.day:02d} {MOIS_RFC822[moment.month - 1]} "
+            f"{moment.year} {moment:%H:%M:%S} {fuseau}")
+
+
+def flux_rss(nom: str, articles: list) -> str:
+    morceaux = ['<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0">\n    <channel>\n',
+                f"        <title>{nom}</title>\n"]
+    for titre, description, pub_date, categorie, lien in articles:
+        morceaux.append("        <item>\n"
+                        f"            <title><![CDATA[{titre}]]></title>\n"
+                        f"            <link>{lien}</link>\n"
+                        f"            <guid>{lien}</guid>\n"
+                        f"            <pubDate>{pub_date}</pubDate>\n"
+                        f"            <description><![CDATA[{description}]]></description>\n"
+                        f"            <category>{categorie}</category>\n"
+                        "        </item>\n")
+    morceaux.append("    </channel>\n</rss>\n")
+    return "".join(morceaux)
+
+
+def generer_corpus(dossier: str, jours: int = 7, snapshots: int = 2, flux: int = 20, items_par_flux: int = 25,
+                   graine: int = 0, debut: datetime.date = datetime.date(2024, 2, 1)) -> int:
+    """
+    Écrit une arborescence de flux RSS synthétiques (sans réseau) et renvoie le nombre de fichiers.
+    Comme dans le corpus réel, chaque snapshot d'un flux reprend la plupart des articles du snapshot
+    précédent : quelques articles nouveaux apparaissent, les plus anciens disparaissent.
+    """
+    alea = random.Random(graine)
+    articles_par_flux = [[] for _ in range(flux)]
+    nb_fichiers = 0
+    for numero_jour in range(jours):
+        jour = debut + datetime.timedelta(days=numero_jour)
+        for numero_snapshot in range(snapshots):
+            heure = datetime.datetime.combine(jour, datetime.time(8 + numero_snapshot * 24 // max(snapshots, 1) % 16, 46))
+            snapshot = os.path.join(dossier, f"{jour:%m}", f"{jour:%d}",
+                                    f"{JOURS_SEMAINE[jour.weekday()]}.{jour:%Y-%m-%d}.{heure:%H:%M}")
+            os.makedirs(snapshot, exist_ok=True)
+            for numero_flux, articles in enumerate(articles_par_flux):
+                nouveaux = items_par_flux if not articles else max(1, items_par_flux // 5)
+                for _ in range(nouveaux):
+                    publication = heure - datetime.timedelta(minutes=alea.randrange(600))
+                    articles.insert(0, (phrase(alea, 8), phrase(alea, 30), date_rfc822(publication, alea),
+                                        alea.choice(RUBRIQUES), f"https://exemple.fr/{numero_flux}/{alea.getrandbits(48):x}"))
+                del articles[items_par_flux:]
+                nom = f"Flux RSS - {SOURCES[numero_flux % len(SOURCES)]} - {RUBRIQUES[numero_flux % len(RUBRIQUES)]} {numero_flux}"
+                with open(os.path.join(snapshot, nom + ".xml"), "w", encoding="utf-8") as sortie:
+                    sortie.write(flux_rss(nom, articles))
+                nb_fichiers += 1
+    return nb_fichiers
+
+
+# Modèle factice : même interface que les modèles spaCy (pipe, meta) et Trankit (appel sur un texte),
+# pour mesurer le coût des adaptateurs de analyzers.py sans le coût du modèle.
+
+POS_FACTICES = ["DET", "NOUN", "VERB", "DET", "NOUN", "ADP", "NOUN", "CCONJ", "NOUN"]
+REL_FACTICES = ["det", "nsubj", "root", "det", "obj", "case", "nmod", "cc", "conj"]
+
+
+class TokenFactice:
+    def __init__(self, doc, i, texte):
+        self.doc, self.i, self.text = doc, i, texte
+        self.lemma_ = texte.lower()
+        self.pos_ = POS_FACTICES[i % len(POS_FACTICES)]
+        self.dep_ = REL_FACTICES[i % len(REL_FACTICES)]
+
+    @property
+    def head(self):
+        # chaque mot dépend du verbe de son groupe de 9 mots (position 2)
+        return self.doc[min(self.i - self.i % len(POS_FACTICES) + 2, len(self.doc) - 1)]
+
+
+class ModeleFactice:
+    meta = {"name": "factice", "version": "0"}
+
+    def mots(self, texte: str) -> list:
+        return texte.split()
+
+    def __call__(self, texte):
+        if isinstance(texte, list):
+            # entrée multi-documents de Stanza
+            return [self.document_stanza(document.text) for document in texte]
+        phrases = []
+        position = 0
+        for paragraphe in texte.split("\n\n"):
+            mots = self.mots(paragraphe)
+            tokens = []
+            for i, mot in enumerate(mots):
+                tete = min(i - i % len(POS_FACTICES) + 2, len(mots) - 1)
+                tokens.append({"id": i + 1, "text": mot, "lemma": mot.lower(),
+                               "upos": POS_FACTICES[i % len(POS_FACTICES)],
+                               "head": 0 if tete == i else tete + 1,
+                               "deprel": REL_FACTICES[i % len(REL_FACTICES)]})
+            phrases.append({"dspan": (position, position + len(paragraphe)), "tokens": tokens})
+            position += len(paragraphe) + 2
+        return {"sentences": phrases}
+
+    def document_stanza(self, texte: str):
+        from types import SimpleNamespace
+        textes_mots = self.mots(texte)
+        mots = []
+        for i, mot in enumerate(textes_mots):
+            tete = min(i - i % len(POS_FACTICES) + 2, len(textes_mots) - 1)
+            mots.append(SimpleNamespace(text=mot, lemma=mot.lower(), pos=POS_FACTICES[i % len(POS_FACTICES)],
+                                        head=0 if tete == i else tete + 1, deprel=REL_FACTICES[i % len(REL_FACTICES)]))
+        return SimpleNamespace(sentences=[SimpleNamespace(words=mots)])
+
+    def pipe(self, textes, batch_size: int = 64, n_process: int = 1):
+        for texte in textes:
+            doc = []
+            doc.extend(TokenFactice(doc, i, mot) for i, mot in enumerate(self.mots(texte)))
+            yield doc
+
+
+# Ancienne boucle de filtres (filtre_date, filtre_source, filtre_categories de rss_parcours, avant les index),
+# gardée ici comme référence : chaque item est testé par chaque filtre, et les dates (de l'item comme
+# de l'utilisateur) sont analysées à chaque test.
+
+def ancien_filtre_date(item: Item, user_dates: List[str]) -> bool:
+    if not user_dates[0] and not user_dates[1]:
+        return True
+    if not item.pubDate:
+        return False
+    for format_date in ("%a, %d %b %Y %H:%M:%S %Z", "%a, %d %b %Y %H:%M:%S %z", "%Y-%m-%dT%H:%M:%S%z"):
+        try:
+            date_article = datetime.datetime.strptime(item.pubDate, format_date).date()
+            break
+        except ValueError:
+            continue
+    else:
+        # l'ancienne boucle levait TypeError en comparant la chaîne à une date : l'item est écarté, comme dans ReglesFiltres
+        return False
+    date_debut = datetime.datetime.strptime(user_dates[0], "%Y-%m-%d").date() if user_dates[0] else None
+    date_fin = datetime.datetime.strptime(user_dates[1], "%Y-%m-%d").date() if user_dates[1] else None
+    if date_debut and date_fin:
+        return date_debut <= date_article <= date_fin
+    if date_debut:
+        return date_debut <= date_article
+    return date_fin >= date_article
+
+
+def ancien_filtre_source(item: Item, source) -> bool:
+    if not source:
+        return True
+    return bool(item.source) and source.lower() in str(item.source).lower()
+
+
+def ancien_filtre_categories(item: Item, categories: list) -> bool:
+    if not categories:
+        return True
+    if not item.category:
+        return False
+    return any(category.lower() in [cat.lower() for cat in item.category] for category in categories)
+
+
+def bench_filtres(corpus: Corpus) -> dict:
+    """
+    Filtrage par dates, source et catégorie : construction des index, requête indexée,
+    filtrage item par item en flux (filtrer_flux) et ancienne boucle de filtres.
+    """
+    import rss_parcours
+
+    items = corpus.items
+    # les dates non reconnues sont écartées : elles fausseraient la médiane
+    dates = sorted(jour for jour in (rss_parcours.jour_pubdate(item.pubDate, item.source)
+                                     for item_list in items for item in item_list) if jour is not None)
+    milieu = datetime.date.fromordinal(dates[len(dates) // 2]).isoformat() if dates else ""
+    filtres = {"categories": ["politique", "sport"], "source": "monde", "date": [milieu, ""]}
+    index, duree_index = chrono(rss_parcours.IndexCorpus, items)
+    resultat, duree_requete = chrono(rss_parcours.check_filtres, items, filtres, index)
+    flux, duree_flux = chrono(lambda: list(rss_parcours.filtrer_flux(items, filtres)))
+
+    def ancienne_boucle():
+        return [[item for item in item_list
+                 if ancien_filtre_date(item, filtres["date"])
+                 and ancien_filtre_source(item, filtres["source"])
+                 and ancien_filtre_categories(item, filtres["categories"])] for item_list in items]
+
+    anciens, duree_boucle = chrono(ancienne_boucle)
+    selection = [item for item_list in resultat.items for item in item_list]
+    # les trois méthodes doivent sélectionner les mêmes items, dans le même ordre
+    identiques = [id(item) for item in selection] == [id(item) for item_list in flux for item in item_list] \
+        == [id(item) for item_list in anciens for item in item_list]
+    return {
+        "items_selectionnes": len(selection),
+        "index_s": duree_index,
+        "requete_indexee_s": duree_requete,
+        "filtre_flux_s": duree_flux,
+        "ancienne_boucle_s": duree_boucle,
+        "sorties_identiques": identiques,
+    }
+
+
+def bench_annotateurs(corpus: Corpus, batch_size: int = 64) -> dict:
+    """
+    Coût des adaptateurs de analyzers.py (préparation des textes, découpage en paquets, conversion en Token)
+    avec le modèle factice. Pour Stanza, la bibliothèque est nécessaire (construction des documents) :
+    si elle manque, l'erreur est notée dans les résultats.
+    """
+    import analyzers
+
+    modele = ModeleFactice()
+    nb_items = sum(len(item_list) for item_list in corpus.items)
+    resultats = {}
+    corpus_annote = None
+    adaptateurs = {
+        "spacy": lambda: analyzers.all_items_spacy(corpus, modele, batch_size=batch_size),
+        "trankit": lambda: analyzers.all_items_trankit(corpus, modele, batch_size=batch_size),
+        "stanza": lambda: analyzers.all_items_stanza(corpus, modele, batch_size=batch_size),
+    }
+    for nom, annoter in adaptateurs.items():
+        try:
+            annote, duree = chrono(annoter)
+        except ImportError as erreur:
+            resultats[nom] = {"erreur": str(erreur)}
+            continue
+        corpus_annote = corpus_annote or annote
+        resultats[nom] = {"items_par_s": nb_items / duree}
+    return resultats, corpus_annote
+
+
+def bench_suite(jours: int, snapshots: int, flux: int, items_par_flux: int, graine: int = 0) -> dict:
+    import rss_parcours
+    from patterns import all_patterns
+
+    parametres = {"jours": jours, "snapshots": snapshots, "flux": flux, "items_par_flux": items_par_flux, "graine": graine}
+    resultats = {"meta": {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plateforme": platform.platform(),
+        "processeurs": os.cpu_count(),
+        "corpus": parametres,
+    }}
+    with tempfile.TemporaryDirectory() as dossier:
+        _, duree = chrono(generer_corpus, dossier, jours, snapshots, flux, items_par_flux, graine)
+        resultats["generation_s"] = duree
+        resultats["readers"] = bench_readers(dossier)
+        fichiers = rss_parcours.load_corpus(dossier)
+        corpus = Corpus(items=[rss_parcours.parse_file(fichier, "re") for fichier in fichiers])
+    resultats["meta"]["fichiers"] = len(fichiers)
+    resultats["meta"]["items"] = sum(len(item_list) for item_list in corpus.items)
+    resultats["filtres"] = bench_filtres(corpus)
+    resultats["annotateurs"], corpus_annote = bench_annotateurs(corpus)
+    resultats["formats"] = bench_formats(corpus_annote)
+    patrons, duree = chrono(all_patterns, corpus_annote)
+    resultats["patterns"] = {"patrons": len(patrons), "items_par_s": resultats["meta"]["items"] / duree}
+    return resultats
+
+
+def meilleurs_resultats(premier: dict, second: dict) -> dict:
+    """
+    Fusionne deux lancements de la suite en gardant, pour chaque mesure, la meilleure
+    (débit le plus haut, durée la plus courte) : le bruit de la machine pèse moins sur la comparaison.
+    """
+    fusion = dict(premier)
+    for cle, valeur in second.items():
+        avant = premier.get(cle)
+        if isinstance(valeur, dict) and isinstance(avant, dict):
+            fusion[cle] = meilleurs_resultats(avant, valeur)
+        elif isinstance(valeur, float) and isinstance(avant, float):
+            if cle.endswith("_par_s"):
+                fusion[cle] = max(avant, valeur)
+            elif cle.endswith("_s"):
+                fusion[cle] = min(avant, valeur)
+    return fusion
+
+
+def comparer_resultats(ancien: dict, nouveau: dict, tolerance: float = 0.2, chemin: str = "") -> list:
+    """
+    Compare deux résultats de la suite et renvoie les mesures dégradées de plus de tolerance :
+    débit ("_par_s") plus faible, ou durée ("_s") plus longue.
+    """
+    regressions = []
+    for cle, valeur in nouveau.items():
+        avant = ancien.get(cle) if isinstance(ancien, dict) else None
+        nom = f"{chemin}.{cle}" if chemin else cle
+        if isinstance(valeur, dict) and isinstance(avant, dict):
+            regressions.extend(comparer_resultats(avant, valeur, tolerance, nom))
+        elif not isinstance(valeur, (int, float)) or not isinstance(avant, (int, float)) or not avant:
+            continue
+        elif cle.endswith("_par_s") and valeur < avant * (1 - tolerance):
+            regressions.append(f"{nom} : {avant:.1f} -> {valeur:.1f}")
+        elif cle.endswith("_s") and not cle.endswith("_par_s") and valeur > avant * (1 + tolerance):
+            regressions.append(f"{nom} : {avant:.4f}s -> {valeur:.4f}s")
+    return regressions
+
+
+# modules lourds qui ne doivent pas être importés au démarrage de read_corpus.py
+MODULES_LOURDS = ["spacy", "stanza", "trankit", "torch", "feedparser", "tqdm", "tabulate"]
+
+
+def bench_demarrage(module: str = "read_corpus", limite_ms: float = 0) -> dict:
+    """
+    Importe le module dans un nouvel interpréteur avec -X importtime et relève le temps total
+    d'import, les modules les plus coûteux, et les modules lourds importés par erreur.
+    Avec limite_ms, "regression" indique si le temps d'import dépasse la limite ou si un module lourd est importé.
+    """
+    dossier = os.path.dirname(os.path.abspath(__file__))
+    sortie = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=dossier, capture_output=True, text=True)
+    cumuls = {}
+    for ligne in sortie.stderr.splitlines():
+        # format : "import time: self [us] | cumulative | imported package"
+        if not ligne.startswith("import time:") or "cumulative" in ligne:
+            continue
+        _, cumul, nom = ligne[len("import time:"):].split("|")
+        cumuls[nom.strip()] = int(cumul)
+    total_ms = cumuls.get(module, 0) / 1000
+    lourds = [nom for nom in cumuls if nom.split(".")[0] in MODULES_LOURDS]
+    plus_couteux = sorted(cumuls.items(), key=lambda couple: couple[1], reverse=True)[:10]
+    return {
+        "import_ms": total_ms,
+        "modules_lourds": lourds,
+        "plus_couteux_ms": {nom.strip(): cumul / 1000 for nom, cumul in plus_couteux},
+        "regression": bool(lourds) or bool(limite_ms and total_ms > limite_ms),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesures de performance")
+    parser.add_argument("bench", choices=["spacy", "memoire_xml", "formats", "patterns", "readers", "demarrage", "workers", "memoire_corpus", "generer", "suite"], help="Étape à mesurer")
+    parser.add_argument("corpus", type=str, nargs="?", default="", help="Corpus sauvegardé, ou arborescence de flux pour readers")
+    parser.add_argument("--n", type=int, default=200, help="Nombre d'items utilisés (0 = tous)")
+    parser.add_argument("--batch-size", dest="batch_size", type=int, default=64)
+    parser.add_argument("--n-process", dest="n_process", type=int, default=1)
+    parser.add_argument("--method", type=str, default="spacy", choices=["spacy", "stanza", "trankit"], help="Annotateur mesuré (workers)")
+    parser.add_argument("--jours", type=int, default=7, help="Corpus synthétique : nombre de jours (generer, suite)")
+    parser.add_argument("--snapshots", type=int, default=2, help="Corpus synthétique : snapshots par jour")
+    parser.add_argument("--flux", type=int, default=20, help="Corpus synthétique : flux par snapshot")
+    parser.add_argument("--items-par-flux", dest="items_par_flux", type=int, default=25, help="Corpus synthétique : items par flux")
+    parser.add_argument("--graine", type=int, default=0, help="Graine du générateur de corpus synthétique")
+    parser.add_argument("--repetitions", type=int, default=3, help="Nombre de lancements de la suite, dont on garde les meilleures mesures")
+    parser.add_argument("--json", type=str, required=False, help="Fichier où écrire les résultats en JSON")
+    parser.add_argument("--comparer", type=str, required=False, help="Résultats JSON d'un lancement précédent : sortie en erreur si une mesure se dégrade")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Dégradation tolérée par --comparer (0.2 = 20 %%)")
+    parser.add_argument("--limite-ms", dest="limite_ms", type=float, default=0, help="Temps d'import maximal de read_corpus (demarrage)")
+    args = parser.parse_args()
+
+    if args.bench == "readers":
+        resultats = bench_readers(args.corpus)
+    elif args.bench == "memoire_corpus":
+        resultats = bench_memoire_corpus(args.corpus)
+    elif args.bench == "generer":
+        nb_fichiers = generer_corpus(args.corpus, args.jours, args.snapshots, args.flux, args.items_par_flux, args.graine)
+        resultats = {"fichiers": nb_fichiers, "dossier": args.corpus}
+    elif args.bench == "suite":
+        resultats = bench_suite(args.jours, args.snapshots, args.flux, args.items_par_flux, args.graine)
+        for _ in range(args.repetitions - 1):
+            resultats = meilleurs_resultats(resultats, bench_suite(args.jours, args.snapshots, args.flux,
+                                                                   args.items_par_flux, args.graine))
+    elif args.bench == "demarrage":
+        resultats = bench_demarrage(limite_ms=args.limite_ms)
+    else:
+        from analyzers import load_corpus
+        corpus = load_corpus(args.corpus)
+
+    if args.bench == "spacy":
+        resultats = bench_spacy(corpus, args.n, args.batch_size, args.n_process)
+    elif args.bench == "memoire_xml":
+        resultats = bench_memoire_xml(corpus)
+    elif args.bench == "formats":
+        resultats = bench_formats(corpus)
+    elif args.bench == "patterns":
+        resultats = bench_patterns(corpus)
+    elif args.bench == "workers":
+        resultats = bench_workers(corpus, args.method, args.n, args.batch_size)
+    for cle, valeur in resultats.items():
+        print(f"{cle} : {valeur}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as sortie:
+            json.dump(resultats, sortie, indent=4, ensure_ascii=False)
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as entree:
+            regressions = comparer_resultats(json.load(entree), resultats, args.tolerance)
+        for regression in regressions:
+            print(f"régression : {regression}", file=sys.stderr)
+        resultats["regression"] = bool(regressions)
+    if resultats.get("regression"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import hashlib
+import pickle
+import sqlite3
+import sys
+import zlib
+from typing import List, Optional
+from datastructures import Token
+
+"""
+Cache persistant des annotations.
+D'un snapshot à l'autre, les mêmes articles (titre + description) reviennent : on garde, dans une base
+sqlite locale, la liste des tokens déjà produite pour chaque texte, identifiée par (annotateur, version du
+modèle, empreinte du texte). Seuls les textes jamais vus sont envoyés au modèle.
+La base est limitée à taille_max annotations : à la fermeture, les moins récemment utilisées sont supprimées (LRU).
+"""
+
+TAILLE_MAX_DEFAUT = 200_000
+
+
+def cle_annotation(annotateur: str, version: str, texte: str) -> bytes:
+    return hashlib.blake2b("\0".join((annotateur, version, texte)).encode("utf-8"), digest_size=16).digest()
+
+
+class CacheAnnotation:
+    def __init__(self, chemin_cache: str, taille_max: int = TAILLE_MAX_DEFAUT, reconstruire: bool = False):
+        self.connexion = sqlite3.connect(chemin_cache)
+        self.taille_max = taille_max
+        if reconstruire:
+            self.connexion.execute("DROP TABLE IF EXISTS annotations")
+        self.connexion.execute(
+            "CREATE TABLE IF NOT EXISTS annotations ("
+            "cle BLOB PRIMARY KEY, acces INTEGER NOT NULL, tokens BLOB NOT NULL)"
+        )
+        self.connexion.execute("CREATE INDEX IF NOT EXISTS annotations_acces ON annotations (acces)")
+        # horloge logique : chaque lecture ou écriture prend un numéro plus grand que les précédents
+        self.horloge = self.connexion.execute("SELECT COALESCE(MAX(acces), 0) FROM annotations").fetchone()[0]
+        self.acces = {}
+        self.hits = 0
+        self.miss = 0
+
+    def get(self, annotateur: str, version: str, texte: str) -> Optional[List[Token]]:
+        cle = cle_annotation(annotateur, version, texte)
+        ligne = self.connexion.execute("SELECT tokens FROM annotations WHERE cle = ?", (cle,)).fetchone()
+        if ligne is None:
+            self.miss += 1
+            return None
+        self.hits += 1
+        self.horloge += 1
+        # les dates d'accès sont écrites en une fois à la fermeture
+        self.acces[cle] = self.horloge
+        return [Token(*champs) for champs in pickle.loads(zlib.decompress(ligne[0]))]
+
+    def put(self, annotateur: str, version: str, texte: str, tokens: List[Token]) -> None:
+        # tuples plutôt que dataclasses, compressés : les formes et lemmes se répètent beaucoup
+        champs = [(t.Form, t.Lemma, t.POS, t.Gouv_lemme, t.Gouv_pos, t.Rel, t.Gouv_id) for t in tokens]
+        self.horloge += 1
+        self.connexion.execute(
+            "INSERT OR REPLACE INTO annotations VALUES (?, ?, ?)",
+            (cle_annotation(annotateur, version, texte), self.horloge,
+             zlib.compress(pickle.dumps(champs, protocol=pickle.HIGHEST_PROTOCOL))),
+        )
+
+    def evincer(self) -> int:
+        """
+        Supprime les annotations les moins récemment utilisées au-delà de taille_max. Renvoie le nombre supprimé.
+        """
+        self.connexion.executemany("UPDATE annotations SET acces = ? WHERE cle = ?",
+                                   ((acces, cle) for cle, acces in self.acces.items()))
+        self.acces = {}
+        taille = self.connexion.execute("SELECT COUNT(*) FROM annotations").fetchone()[0]
+        if taille <= self.taille_max:
+            return 0
+        self.connexion.execute(
+            "DELETE FROM annotations WHERE cle IN (SELECT cle FROM annotations ORDER BY acces LIMIT ?)",
+            (taille - self.taille_max,),
+        )
+        return taille - self.taille_max
+
+    def close(self) -> None:
+        evincees = self.evincer()
+        self.connexion.commit()
+        self.connexion.close()
+        total = self.hits + self.miss
+        taux = self.hits / total if total else 0.0
+        print(f"cache d'annotation : {self.hits} hits, {self.miss} miss ({taux:.1%} de hits), "
+              f"{evincees} annotations évincées", file=sys.stderr)
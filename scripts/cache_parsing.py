@@ -0,0 +1,70 @@
+import os
+import pickle
+import sqlite3
+import sys
+from typing import List, Optional
+from datastructures import Item
+
+"""
+Cache persistant du parsing des fichiers du corpus.
+Les anciens snapshots ne changent jamais : on garde, dans une base sqlite locale, la liste des items
+déjà parsés pour chaque fichier, identifiée par (chemin, méthode, mtime, taille).
+Seuls les fichiers nouveaux ou modifiés sont re-parsés.
+"""
+
+
+class CacheParsing:
+    def __init__(self, chemin_cache: str, reconstruire: bool = False):
+        self.connexion = sqlite3.connect(chemin_cache)
+        if reconstruire:
+            self.connexion.execute("DROP TABLE IF EXISTS fichiers")
+        self.connexion.execute(
+            "CREATE TABLE IF NOT EXISTS fichiers ("
+            "chemin TEXT NOT NULL, methode TEXT NOT NULL, mtime INTEGER NOT NULL, "
+            "taille INTEGER NOT NULL, items BLOB NOT NULL, PRIMARY KEY (chemin, methode))"
+        )
+        self.hits = 0
+        self.miss = 0
+
+    def est_a_jour(self, chemin, methode: str) -> bool:
+        """
+        Indique si le fichier est en cache et n'a pas changé, sans charger ses items ni compter de hit ou de miss.
+        """
+        stat = os.stat(chemin)
+        ligne = self.connexion.execute(
+            "SELECT 1 FROM fichiers WHERE chemin = ? AND methode = ? AND mtime = ? AND taille = ?",
+            (str(chemin), methode, stat.st_mtime_ns, stat.st_size),
+        ).fetchone()
+        return ligne is not None
+
+    def get(self, chemin, methode: str) -> Optional[List[Item]]:
+        """
+        Renvoie les items du fichier s'il n'a pas changé depuis sa mise en cache, None sinon.
+        """
+        stat = os.stat(chemin)
+        ligne = self.connexion.execute(
+            "SELECT items FROM fichiers WHERE chemin = ? AND methode = ? AND mtime = ? AND taille = ?",
+            (str(chemin), methode, stat.st_mtime_ns, stat.st_size),
+        ).fetchone()
+        if ligne is None:
+            self.miss += 1
+            return None
+        self.hits += 1
+        return [Item(*champs) for champs in pickle.loads(ligne[0])]
+
+    def put(self, chemin, methode: str, items: List[Item]) -> None:
+        stat = os.stat(chemin)
+        # on stocke des tuples plutôt que les dataclasses : plus compact et indépendant de la classe
+        champs = [(item.source, item.title, item.description, item.category, item.pubDate) for item in items]
+        self.connexion.execute(
+            "INSERT OR REPLACE INTO fichiers VALUES (?, ?, ?, ?, ?)",
+            (str(chemin), methode, stat.st_mtime_ns, stat.st_size,
+             pickle.dumps(champs, protocol=pickle.HIGHEST_PROTOCOL)),
+        )
+
+    def close(self) -> None:
+        self.connexion.commit()
+        self.connexion.close()
+        total = self.hits + self.miss
+        taux = self.hits / total if total else 0.0
+        print(f"cache de parsing : {self.hits} hits, {self.miss} miss ({taux:.1%} de hits)", file=sys.stderr)
@@ -1,14 +1,40 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields, MISSING
 from typing import List
 import xml.etree.ElementTree as ET
-from xml.etree.ElementTree import fromstring
 from pathlib import Path
+from array import array
 import json
+import mmap
 import pickle
 import sys
 
 
-@dataclass
+def interner(chaine):
+    # une seule copie en mémoire de chaque chaîne répétée (sources, catégories, POS, relations, lemmes...)
+    return sys.intern(chaine) if type(chaine) is str else chaine
+
+
+def _etat(objet) -> dict:
+    # même format d'état que les dataclasses sans slots : les pickles restent lisibles dans les deux sens
+    return {champ.name: getattr(objet, champ.name) for champ in fields(objet)}
+
+
+def _restaurer(objet, etat) -> None:
+    """
+    Restaure un Item ou un Token dépicklé : l'état est un __dict__ pour les pickles écrits avant slots=True,
+    un tuple (None, slots) pour ceux écrits sans __getstate__. Les champs absents des anciens pickles (Gouv_id...) prennent leur valeur par défaut.
+    """
+    if isinstance(etat, tuple):
+        dictionnaire, slots = etat
+        etat = {**(dictionnaire or {}), **(slots or {})}
+    for champ in fields(objet):
+        setattr(objet, champ.name, etat.get(champ.name, None if champ.default is MISSING else champ.default))
+    objet.__post_init__()
+
+
+# slots=True : pas de __dict__ par instance, ce qui compte pour les millions de tokens d'un corpus annoté
+
+@dataclass(slots=True)
 class Item:
     source: str
     title: str
@@ -17,11 +43,20 @@ class Item:
     pubDate: str
     analysis: List[str] = None
 
+    def __post_init__(self):
+        self.source = interner(self.source)
+        self.pubDate = interner(self.pubDate)
+        if self.category:
+            self.category = [interner(category) for category in self.category]
+
+    __getstate__ = _etat
+    __setstate__ = _restaurer
+
 @dataclass
 class Corpus:
     items: List[List[Item]]
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     Form: str
     Lemma: str
@@ -29,6 +64,18 @@ class Token:
     Gouv_lemme: str
     Gouv_pos: str
     Rel: str
+    Gouv_id: int = None     # position du gouverneur dans item.analysis (la racine pointe sur elle-même)
+
+    def __post_init__(self):
+        self.Form = interner(self.Form)
+        self.Lemma = interner(self.Lemma)
+        self.POS = interner(self.POS)
+        self.Gouv_lemme = interner(self.Gouv_lemme)
+        self.Gouv_pos = interner(self.Gouv_pos)
+        self.Rel = interner(self.Rel)
+
+    __getstate__ = _etat
+    __setstate__ = _restaurer
 
     def to_dict(self):
         return {
@@ -37,12 +84,13 @@ class Token:
             'POS': self.POS,
             'Gouv_lemme': self.Gouv_lemme,
             'Gouv_pos' : self.Gouv_pos,
-            'Rel': self.Rel
+            'Rel': self.Rel,
+            'Gouv_id': self.Gouv_id
         }
 
 
 
-@dataclass
+@dataclass(frozen=True)
 class Patron:
     dep_lemme: str
     dep_pos: str
@@ -54,85 +102,156 @@ class Patron:
     role2: str
 
 
+@dataclass
+class SpecPatron:
+    """
+    Description d'un patron : le dépendant (pos, relation), son gouverneur (pos, et relation
+    exigée si un second niveau est demandé) et, optionnellement, le gouverneur du gouverneur.
+    """
+    nom: str
+    dep_pos: str
+    dep_rel: str
+    gouv1_pos: str
+    gouv1_rel: str = None
+    gouv2_pos: str = None
 
-def save_xml(corpus: Corpus, output_file) -> None:
-    root = ET.Element("corpus")
 
-    for item_list in corpus.items:
-        item_list_elem = ET.SubElement(root, "itemList")
+
+def escape(texte: str) -> str:
+    # équivalent de xml.sax.saxutils.escape, qui importe urllib et ralentit le démarrage
+    return texte.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _element_xml(tag: str, texte, niveau: int) -> str:
+    indentation = "\t" * niveau
+    if texte is None or texte == "":
+        return f"{indentation}<{tag} />\n"
+    return f"{indentation}<{tag}>{escape(str(texte))}</{tag}>\n"
+
+
+def _item_xml(item: Item) -> str:
+    morceaux = ["\t\t<item>\n",
+                _element_xml("source", item.source, 3),
+                _element_xml("title", item.title, 3),
+                _element_xml("description", item.description, 3),
+                _element_xml("category", ",".join(item.category), 3),
+                _element_xml("pubDate", item.pubDate, 3)]
+    if item.analysis:
+        morceaux.append("\t\t\t<analysis>\n")
+        for token in item.analysis:
+            morceaux.append("\t\t\t\t<token>\n")
+            for key, value in token.to_dict().items():
+                morceaux.append(_element_xml(key, value, 5))
+            morceaux.append("\t\t\t\t</token>\n")
+        morceaux.append("\t\t\t</analysis>\n")
+    morceaux.append("\t\t</item>\n")
+    return "".join(morceaux)
+
+
+def write_xml(item_lists, sortie, xml_declaration: bool = True) -> None:
+    """
+    Écrit les listes d'items au fil de l'eau dans un fichier déjà ouvert :
+    seul l'item en cours est en mémoire, quelle que soit la taille du corpus.
+    """
+    if xml_declaration:
+        sortie.write("<?xml version='1.0' encoding='utf-8'?>\n")
+    sortie.write("<corpus>\n")
+    for item_list in item_lists:
+        sortie.write("\t<itemList>\n")
         for item in item_list:
-            item_elem = ET.SubElement(item_list_elem, "item")
-            source_elem = ET.SubElement(item_elem, "source")
-            source_elem.text = item.source
-            title_elem = ET.SubElement(item_elem, "title")
-            title_elem.text = item.title
-            description_elem = ET.SubElement(item_elem, "description")
-            description_elem.text = item.description
-            category_elem = ET.SubElement(item_elem, "category")
-            category_elem.text = ",".join(item.category)
-            pubDate_elem = ET.SubElement(item_elem, "pubDate")
-            pubDate_elem.text = item.pubDate
-            if item.analysis:
-                analysis_elem = ET.SubElement(item_elem, "analysis")
-                for token in item.analysis:
-                    token_elem = ET.SubElement(analysis_elem, "token")
-                    for key, value in token.to_dict().items():
-                        sub_elem = ET.SubElement(token_elem, key)
-                        sub_elem.text = value
-
-    tree = ET.ElementTree(root)
-    ET.indent(tree, space="\t", level=0)
-    
+            sortie.write(_item_xml(item))
+        sortie.write("\t</itemList>\n")
+        # chaque liste est envoyée tout de suite : le programme qui lit le pipe commence sans attendre la fin
+        sortie.flush()
+    sortie.write("</corpus>\n")
+
+
+def save_xml(corpus: Corpus, output_file) -> None:
     if output_file == sys.stdout:
-        print(ET.tostring(root, encoding='unicode'))
+        write_xml(corpus.items, sys.stdout, xml_declaration=False)
     else:
-        tree.write(output_file, encoding="utf-8", xml_declaration=True)
+        with open(output_file, "w", encoding="utf-8") as sortie:
+            write_xml(corpus.items, sortie)
 
-def load_xml(input_file: str) -> Corpus:
 
-    items = []
+def iter_xml(input_file):
+    """
+    Lit un corpus xml au fil de l'eau avec iterparse et renvoie les items liste par liste (un itemList à la fois).
+    Les éléments sont vidés dès qu'ils ont été convertis : la mémoire ne dépend pas de la taille du corpus.
+    """
     if input_file == sys.stdin:
-        donnees = input_file.read()
-        root = fromstring(donnees)
-    else:     
-        root = ET.parse(input_file).getroot()
-
-    for item_list_elem in root.findall("itemList"):
-        item_list = []
-        for item_elem in item_list_elem.findall("item"):
-            source = item_elem.find("source").text
-            title = item_elem.find("title").text
-            description = item_elem.find("description").text
-            category = item_elem.find("category").text.split(",")
-            pubDate = item_elem.find("pubDate").text
+        input_file = sys.stdin.buffer
+    racine = None
+    item_list = []
+    for evenement, elem in ET.iterparse(input_file, events=("start", "end")):
+        if evenement == "start":
+            if racine is None:
+                racine = elem
+            continue
+        if elem.tag == "item":
             analysis = []
-            if item_elem.find("analysis") is not None:
-                for token_elem in item_elem.findall("analysis/token"):
-                    token_dict = {elem.tag: elem.text for elem in token_elem}
-                    analysis.append(Token(**token_dict))
-            item_list.append(Item(source=source, title=title, description=description, category=category, pubDate=pubDate, analysis=analysis))
-        items.append(item_list)
+            for token_elem in elem.iterfind("analysis/token"):
+                token_dict = {sub_elem.tag: sub_elem.text for sub_elem in token_elem}
+                if token_dict.get("Gouv_id") is not None:
+                    token_dict["Gouv_id"] = int(token_dict["Gouv_id"])
+                analysis.append(Token(**token_dict))
+            categories = elem.findtext("category")
+            item_list.append(Item(
+                source=elem.findtext("source"),
+                title=elem.findtext("title"),
+                description=elem.findtext("description"),
+                # <category /> vide : aucune catégorie, comme après un aller-retour json ou jsonl
+                category=categories.split(",") if categories else [],
+                pubDate=elem.findtext("pubDate"),
+                analysis=analysis))
+            elem.clear()
+        elif elem.tag == "itemList":
+            yield item_list
+            item_list = []
+            # on détache les itemList déjà lus de la racine pour libérer la mémoire
+            racine.clear()
 
-    return Corpus(items=items)
 
-def save_json(corpus: Corpus, output_file: str) -> None:
+def load_xml(input_file: str) -> Corpus:
+    return Corpus(items=list(iter_xml(input_file)))
+
+def item_to_dict(item: Item) -> dict:
+    analysis_data = [token.to_dict() for token in item.analysis] if item.analysis else None
+    return {
+        "source": item.source,
+        "title": item.title,
+        "description": item.description,
+        "category": item.category,
+        "pubDate": item.pubDate,
+        "analysis": analysis_data
+    }
+
+
+def corpus_to_dict(corpus: Corpus) -> dict:
     dico_data = dict()
     i = 0
     for items in corpus.items:
         i += 1
-        file_data = []
-        for item in items:
-            analysis_data = [token.to_dict() for token in item.analysis] if item.analysis else None
-            file_data.append({
-                "source": item.source,
-                "title": item.title,
-                "description": item.description,
-                "category": item.category,
-                "pubDate": item.pubDate,
-                "analysis": analysis_data
-            })
-        dico_data["file_" + str(i)] = file_data
-        
+        dico_data["file_" + str(i)] = [item_to_dict(item) for item in items]
+    return dico_data
+
+
+def write_json(item_lists, sortie) -> None:
+    """
+    Écrit les listes d'items au fil de l'eau, avec le même texte que json.dump(corpus_to_dict(corpus), indent=4) :
+    seule la liste en cours est en mémoire.
+    """
+    i = 0
+    for items in item_lists:
+        i += 1
+        liste = json.dumps([item_to_dict(item) for item in items], indent=4).replace("\n", "\n    ")
+        sortie.write(("{\n" if i == 1 else ",\n") + '    "file_' + str(i) + '": ' + liste)
+        sortie.flush()
+    sortie.write("\n}" if i else "{}")
+
+
+def save_json(corpus: Corpus, output_file: str) -> None:
+    dico_data = corpus_to_dict(corpus)
     if output_file == sys.stdout:  
         print(json.dumps(dico_data, indent=4))
     else:
@@ -148,21 +267,74 @@ def load_json(input_file: str) -> Corpus:
 
     corpus = Corpus(items=[])
     for key, items_list in json_object.items():
-        items = []
-        for item in items_list:
-            analysis = [Token(**token_dict) for token_dict in item.get('analysis', [])]
-            items.append(Item(
-                source=item['source'],
-                title=item['title'],
-                description=item['description'],
-                category=item['category'],
-                pubDate=item['pubDate'],
-                analysis=analysis
-            ))
-        corpus.items.append(items)
+        corpus.items.append([item_from_dict(item) for item in items_list])
 
     return corpus
 
+
+def item_from_dict(item: dict) -> Item:
+    analysis = [Token(**token_dict) for token_dict in item.get('analysis') or []]
+    return Item(
+        source=item['source'],
+        title=item['title'],
+        description=item['description'],
+        category=item['category'],
+        pubDate=item['pubDate'],
+        analysis=analysis
+    )
+
+
+# JSON Lines : un item par ligne, avec le numéro de sa liste d'items ("liste").
+# Contrairement au json, chaque ligne se lit seule : on peut traiter le flux pendant qu'il arrive.
+
+def write_jsonl(item_lists, sortie) -> None:
+    i = 0
+    for items in item_lists:
+        i += 1
+        for item in items:
+            enregistrement = item_to_dict(item)
+            enregistrement["liste"] = i
+            sortie.write(json.dumps(enregistrement) + "\n")
+        sortie.flush()
+
+
+def save_jsonl(corpus: Corpus, output_file) -> None:
+    if output_file == sys.stdout:
+        write_jsonl(corpus.items, sys.stdout)
+    else:
+        with open(output_file, "w", encoding="utf-8") as sortie:
+            write_jsonl(corpus.items, sortie)
+
+
+def iter_jsonl(input_file):
+    """
+    Lit un corpus JSON Lines ligne par ligne et renvoie les items liste par liste,
+    dès que la liste suivante commence (les listes vides ne sont pas représentées).
+    """
+    # input_file peut être sys.stdin ou un autre fichier déjà ouvert
+    fichier = input_file if hasattr(input_file, "read") else open(input_file, "r", encoding="utf-8")
+    try:
+        items = []
+        numero = None
+        for ligne in fichier:
+            if not ligne.strip():
+                continue
+            enregistrement = json.loads(ligne)
+            if items and enregistrement.get("liste") != numero:
+                yield items
+                items = []
+            numero = enregistrement.get("liste")
+            items.append(item_from_dict(enregistrement))
+        if items:
+            yield items
+    finally:
+        if fichier is not input_file:
+            fichier.close()
+
+
+def load_jsonl(input_file) -> Corpus:
+    return Corpus(items=list(iter_jsonl(input_file)))
+
 def save_pickle(corpus: Corpus, output_file) -> None:
     if output_file == sys.stdout:
        pickle.dump(corpus, sys.stdout.buffer)
@@ -179,5 +351,225 @@ def load_pickle(input_file: Path) -> Corpus:
     for item_list in corpus.items:
         for item in item_list:
             if hasattr(item, 'analysis') and item.analysis is not None:
-                item.analysis = [Token(**token_dict) for token_dict in item.analysis]
+                item.analysis = [Token(**token) if isinstance(token, dict) else token for token in item.analysis]
+    return corpus
+
+
+# Format colonnaire binaire (.rsscol)
+#
+# MAGIC_RSSCOL | taille de l'en-tête (8 octets) | en-tête json | bourrage | colonnes
+# L'en-tête contient le vocabulaire (toutes les chaînes du corpus, chacune stockée une seule fois,
+# l'indice 0 valant None), les métadonnées des items sous forme d'indices dans ce vocabulaire,
+# et la position des colonnes. Chaque champ des Token est une colonne d'entiers non signés
+# (array 'I'), et OFFSETS donne pour chaque item la plage de ses tokens dans les colonnes.
+# La colonne GOUV_ID contient Gouv_id + 1 (0 quand le gouverneur n'est pas connu).
+
+MAGIC_RSSCOL = b"RSSCOL1\n"
+COLONNES_TOKEN = ["Form", "Lemma", "POS", "Gouv_lemme", "Gouv_pos", "Rel"]
+
+
+class Vocabulaire:
+    def __init__(self):
+        self.chaines = [None]
+        self.indices = {None: 0}
+
+    def indice(self, chaine) -> int:
+        indice = self.indices.get(chaine)
+        if indice is None:
+            indice = len(self.chaines)
+            self.indices[chaine] = indice
+            self.chaines.append(chaine)
+        return indice
+
+
+class ColonnesTokens:
+    """
+    Tokens d'un corpus stockés en colonnes : pour chaque champ, un array d'indices dans le vocabulaire
+    (4 octets par champ et par token), et la position du gouverneur + 1 (0 pour None).
+    """
+    def __init__(self, chaines: List[str], colonnes: List[array], gouv_ids: array):
+        self.chaines = chaines
+        self.colonnes = colonnes
+        self.gouv_ids = gouv_ids
+
+    def token(self, position: int) -> Token:
+        gouv_id = self.gouv_ids[position] if self.gouv_ids is not None else 0
+        return Token(*(self.chaines[colonne[position]] for colonne in self.colonnes),
+                     Gouv_id=None if gouv_id == 0 else gouv_id - 1)
+
+
+class VueTokens:
+    """
+    Vue légère sur les tokens d'un item (positions debut à fin dans des ColonnesTokens), utilisable
+    comme la liste de Token de item.analysis : les Token sont créés seulement quand on les lit.
+    Copiée ou sauvegardée avec pickle, elle redevient une liste de Token.
+    """
+    __slots__ = ("colonnes", "debut", "fin")
+
+    def __init__(self, colonnes: ColonnesTokens, debut: int, fin: int):
+        self.colonnes = colonnes
+        self.debut = debut
+        self.fin = fin
+
+    def __len__(self) -> int:
+        return self.fin - self.debut
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("indice de token hors de l'item")
+        return self.colonnes.token(self.debut + indice)
+
+    def __iter__(self):
+        for position in range(self.debut, self.fin):
+            yield self.colonnes.token(position)
+
+    def __eq__(self, autre) -> bool:
+        # analysis peut valoir None (item non annoté) : la comparaison est laissée à l'autre opérande
+        if not isinstance(autre, (VueTokens, list, tuple)):
+            return NotImplemented
+        return list(self) == list(autre)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+def compacter(corpus: Corpus) -> Corpus:
+    """
+    Remplace, dans chaque item annoté, la liste de Token par une VueTokens sur des colonnes
+    communes à tout le corpus : quelques octets par token au lieu d'un objet par token.
+    """
+    vocabulaire = Vocabulaire()
+    colonnes = [array("I") for _ in COLONNES_TOKEN]
+    gouv_ids = array("I")
+    tokens = ColonnesTokens(vocabulaire.chaines, colonnes, gouv_ids)
+    for item_list in corpus.items:
+        for item in item_list:
+            if item.analysis is None:
+                continue
+            debut = len(gouv_ids)
+            for token in item.analysis:
+                for nom, colonne in zip(COLONNES_TOKEN, colonnes):
+                    colonne.append(vocabulaire.indice(getattr(token, nom)))
+                gouv_ids.append(0 if token.Gouv_id is None else token.Gouv_id + 1)
+            item.analysis = VueTokens(tokens, debut, len(gouv_ids))
+    return corpus
+
+
+def save_rsscol(corpus: Corpus, output_file) -> None:
+    vocabulaire = Vocabulaire()
+    colonnes = {nom: array("I") for nom in COLONNES_TOKEN}
+    gouv_ids = array("I")
+    offsets = array("Q", [0])
+    items = []
+    for item_list in corpus.items:
+        for item in item_list:
+            categories = None if item.category is None else [vocabulaire.indice(cat) for cat in item.category]
+            items.append([vocabulaire.indice(item.source), vocabulaire.indice(item.title),
+                          vocabulaire.indice(item.description), vocabulaire.indice(item.pubDate),
+                          categories, item.analysis is not None])
+            for token in item.analysis or []:
+                for nom in COLONNES_TOKEN:
+                    colonnes[nom].append(vocabulaire.indice(getattr(token, nom)))
+                gouv_ids.append(0 if token.Gouv_id is None else token.Gouv_id + 1)
+            offsets.append(len(colonnes["Form"]))
+
+    position = 0
+    positions = {}
+    for nom, colonne in [("OFFSETS", offsets)] + list(colonnes.items()) + [("GOUV_ID", gouv_ids)]:
+        positions[nom] = [position, len(colonne)]
+        position += len(colonne) * colonne.itemsize
+    entete = json.dumps({
+        "ordre": sys.byteorder,
+        "vocabulaire": vocabulaire.chaines,
+        "listes": [len(item_list) for item_list in corpus.items],
+        "items": items,
+        "colonnes": positions,
+    }, ensure_ascii=False).encode("utf-8")
+    debut_donnees = len(MAGIC_RSSCOL) + 8 + len(entete)
+    bourrage = -debut_donnees % 8   # colonnes alignées sur 8 octets pour pouvoir les lire directement via mmap
+
+    with open(output_file, "wb") as file:
+        file.write(MAGIC_RSSCOL)
+        file.write(len(entete).to_bytes(8, "little"))
+        file.write(entete)
+        file.write(b"\0" * bourrage)
+        offsets.tofile(file)
+        for colonne in colonnes.values():
+            colonne.tofile(file)
+        gouv_ids.tofile(file)
+
+
+def load_rsscol(input_file) -> Corpus:
+    """
+    Charge un corpus .rsscol : le fichier est projeté en mémoire (mmap), l'en-tête est lu dans la projection
+    et chaque colonne d'entiers en est copiée d'un bloc dans un array (un memcpy par colonne, aucun objet
+    Python par token). Ce n'est donc pas un chargement sans copie : la projection est fermée avant de rendre
+    le corpus, pour que le fichier puisse ensuite être réécrit (un fichier projeté puis tronqué ferait
+    planter le programme à la lecture suivante d'une colonne).
+    """
+    with open(input_file, "rb") as file:
+        projection = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if projection[:len(MAGIC_RSSCOL)] != MAGIC_RSSCOL:
+        projection.close()
+        raise ValueError("Le fichier n'est pas au format rsscol\n")
+    taille_entete = int.from_bytes(projection[len(MAGIC_RSSCOL):len(MAGIC_RSSCOL) + 8], "little")
+    debut_entete = len(MAGIC_RSSCOL) + 8
+    entete = json.loads(projection[debut_entete:debut_entete + taille_entete].decode("utf-8"))
+    debut_donnees = debut_entete + taille_entete
+    debut_donnees += -debut_donnees % 8
+
+    vues = []
+    donnees = memoryview(projection)
+    colonnes = {}
+    for nom, (position, longueur) in entete["colonnes"].items():
+        format_colonne = "Q" if nom == "OFFSETS" else "I"
+        debut = debut_donnees + position
+        vue = donnees[debut:debut + longueur * array(format_colonne).itemsize].cast(format_colonne)
+        vues.append(vue)
+        if entete["ordre"] != sys.byteorder:
+            vue = array(format_colonne, vue)
+            vue.byteswap()
+        colonnes[nom] = vue
+
+    def copie(nom):
+        # copie de la colonne hors de la projection, qui est fermée à la fin du chargement
+        colonne = array("I")
+        colonne.frombytes(memoryview(colonnes[nom]).cast("B"))
+        return colonne
+
+    chaines = [interner(chaine) for chaine in entete["vocabulaire"]]
+    offsets = colonnes["OFFSETS"]
+    tokens = ColonnesTokens(chaines, [copie(nom) for nom in COLONNES_TOKEN],
+                            copie("GOUV_ID") if "GOUV_ID" in colonnes else None)
+    corpus = Corpus(items=[])
+    metadonnees = iter(enumerate(entete["items"]))
+    for nb_items in entete["listes"]:
+        item_list = []
+        for _ in range(nb_items):
+            numero, (source, title, description, pubDate, categories, annote) = next(metadonnees)
+            analysis = None
+            if annote:
+                # les tokens restent en colonnes : item.analysis est une vue sur ses positions
+                analysis = VueTokens(tokens, offsets[numero], offsets[numero + 1])
+            item_list.append(Item(
+                source=chaines[source],
+                title=chaines[title],
+                description=chaines[description],
+                category=None if categories is None else [chaines[cat] for cat in categories],
+                pubDate=chaines[pubDate],
+                analysis=analysis))
+        corpus.items.append(item_list)
+
+    # les vues doivent être libérées avant de pouvoir fermer la projection
+    for vue in vues:
+        vue.release()
+    donnees.release()
+    projection.close()
     return corpus
@@ -0,0 +1,147 @@
+import atexit
+import json
+import math
+import sys
+import time
+from contextlib import contextmanager
+
+"""
+Instrumentation légère de la chaîne read_corpus.py -> analyzers.py -> patterns.py :
+- des chronomètres par étape (parcours, parse, dédoublonnage, filtre, écriture, annotation, patrons...),
+  avec le temps propre de l'étape (sans les étapes appelées à l'intérieur) et le temps total
+- des compteurs (fichiers, items...)
+- des latences par fichier (parse de chaque fichier, par lecteur de rss_reader), résumées en p50/p95
+- en option (--profile), cProfile et tracemalloc
+Le rapport est un JSON écrit à la fin du programme (dans un fichier, ou sur la sortie d'erreur).
+Tant que activer() n'est pas appelé, rien n'est écrit et les mesures coûtent quelques appels à perf_counter.
+"""
+
+
+def percentile(valeurs, q: float) -> float:
+    # rang le plus proche, sur des valeurs triées
+    if not valeurs:
+        return 0.0
+    return valeurs[min(len(valeurs) - 1, max(0, math.ceil(q * len(valeurs)) - 1))]
+
+
+class Mesures:
+    def __init__(self):
+        self.etapes = {}
+        self.compteurs = {}
+        self.latences = {}
+        self.pile = []
+        self.profileur = None
+        self.debut = time.perf_counter()
+
+    @contextmanager
+    def etape(self, nom: str):
+        debut = time.perf_counter()
+        # temps passé dans les étapes imbriquées, retiré du temps propre de celle-ci
+        self.pile.append(0.0)
+        try:
+            yield
+        finally:
+            duree = time.perf_counter() - debut
+            enfants = self.pile.pop()
+            if self.pile:
+                self.pile[-1] += duree
+            mesure = self.etapes.setdefault(nom, {"appels": 0, "total_s": 0.0, "propre_s": 0.0})
+            mesure["appels"] += 1
+            mesure["total_s"] += duree
+            mesure["propre_s"] += duree - enfants
+
+    def compter(self, nom: str, nombre: int = 1) -> None:
+        self.compteurs[nom] = self.compteurs.get(nom, 0) + nombre
+
+    def latence(self, nom: str, secondes: float) -> None:
+        self.latences.setdefault(nom, []).append(secondes)
+
+    def flux(self, nom: str, flux):
+        """
+        Renvoie les éléments du flux (générateur) en comptant dans l'étape nom le temps passé à les produire.
+        """
+        flux = iter(flux)
+        while True:
+            with self.etape(nom):
+                try:
+                    element = next(flux)
+                except StopIteration:
+                    return
+            yield element
+
+    def activer_profil(self) -> None:
+        import cProfile
+        import tracemalloc
+        tracemalloc.start()
+        self.profileur = cProfile.Profile()
+        self.profileur.enable()
+
+    def rapport(self, chemin_profil=None) -> dict:
+        rapport = {
+            "duree_s": time.perf_counter() - self.debut,
+            "etapes": self.etapes,
+            "compteurs": self.compteurs,
+            "latences": {},
+        }
+        for nom, valeurs in self.latences.items():
+            valeurs = sorted(valeurs)
+            rapport["latences"][nom] = {
+                "n": len(valeurs),
+                "p50_ms": percentile(valeurs, 0.50) * 1000,
+                "p95_ms": percentile(valeurs, 0.95) * 1000,
+                "max_ms": valeurs[-1] * 1000,
+            }
+        if self.profileur is not None:
+            rapport["profil"] = self.rapport_profil(chemin_profil)
+        return rapport
+
+    def rapport_profil(self, chemin_profil=None) -> dict:
+        import io
+        import pstats
+        import tracemalloc
+        self.profileur.disable()
+        if chemin_profil:
+            # lisible ensuite avec python -m pstats ou snakeviz
+            self.profileur.dump_stats(chemin_profil)
+        statistiques = pstats.Stats(self.profileur, stream=io.StringIO())
+        fonctions = sorted(statistiques.stats.items(), key=lambda couple: couple[1][3], reverse=True)[:15]
+        courante, pic = tracemalloc.get_traced_memory()
+        allocations = tracemalloc.take_snapshot().statistics("lineno")[:10]
+        tracemalloc.stop()
+        return {
+            "fichier_prof": chemin_profil,
+            "fonctions_cumul_s": {f"{fichier}:{ligne}({nom})": cumul
+                                  for (fichier, ligne, nom), (_, _, _, cumul, _) in fonctions},
+            "memoire_courante": courante,
+            "memoire_pic": pic,
+            "allocations": {str(statistique.traceback[0]): statistique.size for statistique in allocations},
+        }
+
+
+MESURES = Mesures()
+
+etape = MESURES.etape
+compter = MESURES.compter
+latence = MESURES.latence
+flux = MESURES.flux
+
+
+def activer(chemin_rapport=None, profil: bool = False) -> None:
+    """
+    Écrit le rapport à la fin du programme : dans chemin_rapport, ou sur la sortie d'erreur si
+    chemin_rapport vaut "-" ou None. Avec profil, cProfile et tracemalloc tournent jusqu'à la fin
+    (le profil cProfile est enregistré dans chemin_rapport + ".prof").
+    """
+    if profil:
+        MESURES.activer_profil()
+
+    def ecrire():
+        fichier = chemin_rapport if chemin_rapport and chemin_rapport != "-" else None
+        rapport = MESURES.rapport(fichier + ".prof" if (profil and fichier) else None)
+        if fichier:
+            with open(fichier, "w", encoding="utf-8") as sortie:
+                json.dump(rapport, sortie, indent=4, ensure_ascii=False)
+        else:
+            print(json.dumps(rapport, indent=4, ensure_ascii=False), file=sys.stderr)
+
+    atexit.register(ecrire)
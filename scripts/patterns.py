@@ -1,8 +1,12 @@
-from datastructures import Item, Patron, load_xml, load_json, load_pickle, Corpus
+from datastructures import Item, Patron, SpecPatron, Token, load_xml, load_json, load_jsonl, load_pickle, load_rsscol, Corpus
 import argparse
-from typing import List
+from typing import Dict, List, Tuple
 import csv
-from tabulate import tabulate
+import heapq
+import json
+from collections import Counter
+from operator import itemgetter
+import mesures
 
 
 
@@ -12,201 +16,204 @@ from tabulate import tabulate
 # corpus_annote.xml est un fichier contenant l'annotation obtenue avec analyzers.py
 # analyse_patrons.csv est le fichier de sorite csv contenant les patrons extraits avec leurs instances et leurs comptes
 
+# Pour chercher des patrons en plus des cinq patrons par défaut :
+# python3 patterns.py corpus_annote.xml analyse_patrons.csv --patrons mes_patrons.json
+# mes_patrons.json contient une liste d'objets de la forme
+# {"nom": "ADJ_amod_N", "dep_pos": "ADJ", "dep_rel": "amod", "gouv1_pos": "NOUN"}
+# avec, pour un patron à deux niveaux, "gouv1_rel" et "gouv2_pos" en plus
+
+# Pour cumuler les comptes d'un lancement à l'autre dans une base sqlite (seuls les nouveaux items sont comptés) :
+# python3 patterns.py corpus_annote_du_jour.xml analyse_patrons.csv --base patrons.sqlite --top 20
+# et pour interroger la base sans nouveau corpus, par type de patron, source ou dates :
+# python3 patterns.py - analyse_patrons.csv --base patrons.sqlite --type N_obj_V --source lemonde -dd 2024-01-01 -df 2024-01-31
+
 
 
 def load_file(fichier) :
-    if fichier.endswith(('.xml', '.json', '.pkl')):
+    if fichier.endswith(('.xml', '.json', '.jsonl', '.pkl', '.rsscol')):
         if fichier.endswith('.xml'):
             corpus_analyse = load_xml(fichier)
         elif fichier.endswith('.json'):
             corpus_analyse = load_json(fichier)
+        elif fichier.endswith('.jsonl'):
+            corpus_analyse = load_jsonl(fichier)
         elif fichier.endswith('.pkl'):
             corpus_analyse = load_pickle(fichier)
+        elif fichier.endswith('.rsscol'):
+            corpus_analyse = load_rsscol(fichier)
         return corpus_analyse
     else:
-        print("Format de fichier non pris en charge. Vous devez fournir un fichier xml, json ou pkl")
+        print("Format de fichier non pris en charge. Vous devez fournir un fichier xml, json, jsonl, pkl ou rsscol")
         return
 
 
 
+class IndexItem:
+    '''index des tokens d'un item, construit une seule fois par item et partagé par tous les patrons'''
+    def __init__(self, item: Item) :
+        self.tokens = item.analysis or []
+        self._par_forme_pos = None
+
+    @property
+    def par_forme_pos(self) -> dict :
+        '''index (forme, pos) -> tokens, construit seulement si un token n'a pas de Gouv_id'''
+        if self._par_forme_pos is None :
+            self._par_forme_pos = {}
+            for token in self.tokens :
+                self._par_forme_pos.setdefault((token.Form, token.POS), []).append(token)
+        return self._par_forme_pos
+
+    def gouverneurs(self, token: Token, pos: str) -> List[Token] :
+        '''renvoie le(s) gouverneur(s) du token ayant la catégorie pos'''
+        if token.Gouv_id is not None :
+            gouv = self.tokens[token.Gouv_id]
+            return [gouv] if gouv.POS == pos else []
+        # corpus annotés sans Gouv_id : on retrouve le gouverneur par sa forme, comme avant
+        return self.par_forme_pos.get((token.Gouv_lemme, pos), [])
+
+
+
+# Les patrons sont décrits par des données (SpecPatron) puis compilés en une table
+# (pos, relation) du dépendant -> patrons, pour tous les chercher en un seul parcours de l'item.
+
 # 1. Patrons simples :
+N_OBJ_V = SpecPatron("N_obj_V", "NOUN", "obj", "VERB")
+V_NSUBJ_N = SpecPatron("V_nsubj_N", "NOUN", "nsubj", "VERB")
+NOM_NMOD_N = SpecPatron("nom_nmod_N", "NOUN", "nmod", "NOUN")
 
-def N_obj_V(item: Item) -> List[Patron] :
-    '''extrait les patrons du type "le chat mange la souris"'''
+# 2. Patrons complexes :
+ADP_MARK_VERB_XCOMP_VERB = SpecPatron("ADP_mark_VERB_xcomp_VERB", "ADP", "mark", "VERB", "xcomp", "VERB")
+CCONJ_CC_NOUN_CONJ_NOUN = SpecPatron("CCONJ_cc_NOUN_conj_NOUN", "CCONJ", "cc", "NOUN", "conj", "NOUN")
+
+PATRONS_DEFAUT = [V_NSUBJ_N, NOM_NMOD_N, N_OBJ_V, ADP_MARK_VERB_XCOMP_VERB, CCONJ_CC_NOUN_CONJ_NOUN]
+
+
+
+def load_specs(fichier) -> List[SpecPatron] :
+    '''charge des patrons supplémentaires depuis un fichier json (liste d'objets ayant les champs de SpecPatron)'''
+    with open(fichier, 'r', encoding='utf-8') as f :
+        specs = [SpecPatron(**spec) for spec in json.load(f)]
+    for spec in specs :
+        # un patron à deux niveaux a besoin des deux champs : sans gouv1_rel il ne trouverait rien,
+        # et sans gouv2_pos, gouv1_rel serait ignoré
+        if (spec.gouv1_rel is None) != (spec.gouv2_pos is None) :
+            raise ValueError(f"patron {spec.nom} : gouv1_rel et gouv2_pos doivent être donnés ensemble (ou aucun des deux)")
+    return specs
+
+
+
+def compile_specs(specs: List[SpecPatron]) -> Dict[Tuple[str, str], List[SpecPatron]] :
+    '''construit la table (pos, relation) du dépendant -> patrons qui peuvent commencer par ce token'''
+    table = {}
+    for spec in specs :
+        table.setdefault((spec.dep_pos, spec.dep_rel), []).append(spec)
+    return table
+
+
+
+def extraire(item: Item, table: Dict[Tuple[str, str], List[SpecPatron]], index: IndexItem = None) -> List[Patron] :
+    '''cherche en un seul parcours des tokens de l'item tous les patrons de la table'''
+    index = index or IndexItem(item)
     patrons = []
-    for token in item.analysis:
-        if token.POS == 'NOUN' and token.Rel == 'obj':
-            dependant_lemme = token.Lemma
-            dependant_pos = token.POS
-            head = token.Gouv_lemme
-            for gouv in item.analysis:
-                if gouv.Form == head and gouv.POS == 'VERB':
-                    head_lemme = gouv.Lemma
-                    head_pos = gouv.POS
-                    patron = Patron(dependant_lemme, dependant_pos, head_lemme, head_pos, 'obj', '', '', '')
-                    patrons.append(patron)
+    for token in index.tokens:
+        for spec in table.get((token.POS, token.Rel), ()) :
+            for gouv in index.gouverneurs(token, spec.gouv1_pos):
+                if spec.gouv2_pos is None :
+                    patrons.append(Patron(token.Lemma, token.POS, gouv.Lemma, gouv.POS, spec.dep_rel, '', '', ''))
+                elif gouv.Rel == spec.gouv1_rel :
+                    for gouv_du_gouv in index.gouverneurs(gouv, spec.gouv2_pos) :
+                        patrons.append(Patron(token.Lemma, token.POS, gouv.Lemma, gouv.POS, spec.dep_rel,
+                                              gouv_du_gouv.Lemma, gouv_du_gouv.POS, spec.gouv1_rel))
     return patrons
 
 
 
-def V_nsubj_N(item: Item) -> List[Patron] :
+def N_obj_V(item: Item, index: IndexItem = None) -> List[Patron] :
     '''extrait les patrons du type "le chat mange la souris"'''
-    patrons = []
-    for token in item.analysis:
-        if token.POS == 'NOUN' and token.Rel == 'nsubj':
-            dependant_lemme = token.Lemma
-            dependant_pos = token.POS
-            head = token.Gouv_lemme
-            for gouv in item.analysis:
-                if gouv.Form == head and gouv.POS == 'VERB':
-                    head_lemme = gouv.Lemma
-                    head_pos = gouv.POS
-                    patron = Patron(dependant_lemme, dependant_pos, head_lemme, head_pos, 'nsubj', '', '', '')
-                    patrons.append(patron)
-    return patrons
+    return extraire(item, compile_specs([N_OBJ_V]), index)
 
 
 
-def nom_nmod_N(item: Item) -> List[Patron] :
+def V_nsubj_N(item: Item, index: IndexItem = None) -> List[Patron] :
     '''extrait les patrons du type "le chat mange la souris"'''
-    patrons = []
-    for token in item.analysis:
-        if token.POS == 'NOUN' and token.Rel == 'nmod':
-            dependant_lemme = token.Lemma
-            dependant_pos = token.POS
-            head = token.Gouv_lemme
-            for gouv in item.analysis:
-                if gouv.Form == head and gouv.POS == 'NOUN':
-                    head_lemme = gouv.Lemma
-                    head_pos = gouv.POS
-                    patron = Patron(dependant_lemme, dependant_pos, head_lemme, head_pos, 'nmod', '', '', '')
-                    patrons.append(patron)
-    return patrons
+    return extraire(item, compile_specs([V_NSUBJ_N]), index)
 
 
 
-# 2. Patrons complexes :
+def nom_nmod_N(item: Item, index: IndexItem = None) -> List[Patron] :
+    '''extrait les patrons du type "le chat mange la souris"'''
+    return extraire(item, compile_specs([NOM_NMOD_N]), index)
+
 
-def ADP_mark_VERB_xcomp_VERB(item: Item) -> List[Patron] :
+
+def ADP_mark_VERB_xcomp_VERB(item: Item, index: IndexItem = None) -> List[Patron] :
     '''extrait les patrons du type "il est invité à partir"'''
-    patrons = []
-    for token in item.analysis:
-        if token.POS == "ADP" and token.Rel == "mark":
-            dependant_lemme = token.Lemma
-            dependant_pos = token.POS
-            head1 = token.Gouv_lemme
-            for gouv in item.analysis:
-                if gouv.Form == head1 and gouv.POS == "VERB" and gouv.Rel == "xcomp" :
-                    head1_lemme = gouv.Lemma
-                    head1_pos = gouv.POS
-                    head2 = gouv.Gouv_lemme
-                    for gouv_du_gouv in item.analysis :
-                        if gouv_du_gouv.Form == head2 and gouv_du_gouv.POS == "VERB" :
-                            head2_lemme = gouv_du_gouv.Lemma
-                            head2_pos = gouv_du_gouv.POS
-                            patron = Patron(dependant_lemme, dependant_pos, head1_lemme, head1_pos, 'mark', head2_lemme, head2_pos, 'xcomp')
-                            patrons.append(patron)
-    return patrons
+    return extraire(item, compile_specs([ADP_MARK_VERB_XCOMP_VERB]), index)
 
 
 
-def CCONJ_cc_NOUN_conj_NOUN(item: Item) -> List[Patron] :
+def CCONJ_cc_NOUN_conj_NOUN(item: Item, index: IndexItem = None) -> List[Patron] :
     '''extrait les patrons du type "il est invité à partir"'''
-    patrons = []
-    for token in item.analysis:
-        if token.POS == "CCONJ" and token.Rel == "cc":
-            dependant_lemme = token.Lemma
-            dependant_pos = token.POS
-            head1 = token.Gouv_lemme
-            for gouv in item.analysis:
-                if gouv.Form == head1 and gouv.POS == "NOUN" and gouv.Rel == "conj" :
-                    head1_lemme = gouv.Lemma
-                    head1_pos = gouv.POS
-                    head2 = gouv.Gouv_lemme
-                    for gouv_du_gouv in item.analysis :
-                        if gouv_du_gouv.Form == head2 and gouv_du_gouv.POS == "NOUN" :
-                            head2_lemme = gouv_du_gouv.Lemma
-                            head2_pos = gouv_du_gouv.POS
-                            patron = Patron(dependant_lemme, dependant_pos, head1_lemme, head1_pos, 'cc', head2_lemme, head2_pos, 'conj')
-                            patrons.append(patron)
-    return patrons
+    return extraire(item, compile_specs([CCONJ_CC_NOUN_CONJ_NOUN]), index)
 
 
 
-def all_patterns(corpus: Corpus) -> List[Patron] :
-    '''extrait tous les patrons du corpus'''
+def all_patterns(corpus: Corpus, specs: List[SpecPatron] = None) -> List[Patron] :
+    '''extrait tous les patrons du corpus, en un seul parcours par item'''
+    table = compile_specs(PATRONS_DEFAUT if specs is None else specs)
     tous_les_patrons = []
     for item_list in corpus.items:
         for item in item_list:
-            patrons_nom_nmod_N = nom_nmod_N(item)
-            patrons_N_obj_V = N_obj_V(item)
-            patrons_V_nsubj_N = V_nsubj_N(item)
-            patron_mark_xcomp = ADP_mark_VERB_xcomp_VERB(item)
-            patron_conjcoord = CCONJ_cc_NOUN_conj_NOUN(item)
-            tous_les_patrons.extend(patrons_V_nsubj_N)
-            tous_les_patrons.extend(patrons_nom_nmod_N)
-            tous_les_patrons.extend(patrons_N_obj_V)
-            tous_les_patrons.extend(patron_mark_xcomp)
-            tous_les_patrons.extend(patron_conjcoord)
+            tous_les_patrons.extend(extraire(item, table))
     return tous_les_patrons
 
 
 
-def patron_to_string(liste_patrons: List[Patron]) -> List[str] :
-    '''convertit une liste de patrons en liste de strings triée'''
-    patrons_string = []
-    for patron in liste_patrons :
-        patstr = str(patron.dep_pos)+", "+str(patron.dep_lemme)+", "+str(patron.role1)+", "+str(patron.gouv1_pos)+", "+str(patron.gouv1_lemme)+", "+str(patron.role2)+", "+str(patron.gouv2_pos)+", "+str(patron.gouv2_lemme)
-        patrons_string.append(patstr)
-    patrons_string = sorted(patrons_string)
-    return patrons_string
+def compte_patrons(corpus: Corpus, specs: List[SpecPatron] = None) -> Counter :
+    '''compte les patrons item par item, sans garder la liste de tous les patrons du corpus'''
+    table = compile_specs(PATRONS_DEFAUT if specs is None else specs)
+    compteur = Counter()
+    for item_list in corpus.items:
+        for item in item_list:
+            compteur.update(extraire(item, table))
+    return compteur
 
 
 
-def compte_instances(liste_patrons_string: List[str]) -> List[str] :
-    '''compte le nombre de fois où un patron apparraît'''
-    occurrences = {}
-    for patron in liste_patrons_string :
-        if patron in occurrences :
-            occurrences[patron] += 1
-        else :
-            occurrences[patron] = 1
-    patrons_occ = []
-    for pat in occurrences :
-        pat_str = pat + ", " + str(occurrences[pat])
-        patrons_occ.append(pat_str)
-    return patrons_occ
+def meilleurs_patrons(compteur: Counter, k: int = 0) -> List[Tuple[Patron, int]] :
+    '''renvoie les k patrons les plus fréquents (tas de taille k), ou tous les patrons triés si k vaut 0'''
+    if k :
+        return heapq.nlargest(k, compteur.items(), key=itemgetter(1))
+    return compteur.most_common()
 
 
 
-def ecriture_csv(fichier, liste_patrons) :
-    '''écrit une liste de patrons sous forme de strings dans un fichier csv'''
+def ecriture_csv(fichier, liste_patrons: List[Tuple[Patron, int]]) :
+    '''écrit une liste de (patron, compte) dans un fichier csv'''
     with open(fichier, 'w', newline='', encoding='utf-8') as fichier_csv:
         champs = ['dep', 'gouv', 'role1', 'gouverneur_du_gouverneur', 'role2', 'compte']
         ecrire = csv.DictWriter(fichier_csv, fieldnames=champs)
 
         ecrire.writeheader()
-        #for patron in patrons_finaux :
-        for patron in liste_patrons :
+        for patron, compte in liste_patrons :
             ecrire.writerow({
-            'dep': patron[1],
-            'gouv': patron[4],
-            'role1': patron[2],
-            'gouverneur_du_gouverneur': patron[7],
-            'role2': patron[5],
-            'compte' : patron[8]
+            'dep': patron.dep_lemme,
+            'gouv': patron.gouv1_lemme,
+            'role1': patron.role1,
+            'gouverneur_du_gouverneur': patron.gouv2_lemme,
+            'role2': patron.role2,
+            'compte' : compte
             })
 
 
 
-def tableau (liste_patrons: List[List[str]]) :
+def tableau (liste_patrons: List[Tuple[Patron, int]]) :
     '''affiche les patrons simples sous forme d'un tableau'''
+    from tabulate import tabulate
     patrons_simples = []
-    for patron in liste_patrons :
-        if patron[5] == '' :
-            patron = [patron[0], patron[1], patron[2], patron[3], patron[4], patron[8]]
-            print(patron)
-            patrons_simples.append(patron)
+    for patron, compte in liste_patrons :
+        if patron.role2 == '' :
+            patrons_simples.append([patron.dep_pos, patron.dep_lemme, patron.role1, patron.gouv1_pos, patron.gouv1_lemme, compte])
     entetes = ['pred_cat', 'pred_lemme', 'pred_rel', 'arg_cat', 'arg_lemme', 'freq']
     print(tabulate(patrons_simples, headers=entetes))
 
@@ -215,32 +222,57 @@ def tableau (liste_patrons: List[List[str]]) :
 def main() :
     # Gérer les arguments
     parser = argparse.ArgumentParser(description="Extraction des patron.")
-    parser.add_argument("input_file", type=str, help="Chemin du fichier d'analyse")
+    parser.add_argument("input_file", type=str, help="Chemin du fichier d'analyse ('-' avec --base : seulement interroger la base)")
     parser.add_argument("output_file", type=str, help="Chemin vers le fichier de sortie CSV")
+    parser.add_argument("--patrons", type=str, required=False, help="Fichier json de patrons supplémentaires")
+    parser.add_argument("--top", type=int, default=0, help="Ne garder que les N patrons les plus fréquents (0 = tous)")
+    parser.add_argument("--base", type=str, required=False, help="Base sqlite des comptes de patrons, complétée avec les nouveaux items du fichier d'analyse")
+    parser.add_argument("--reconstruire-base", action='store_true', help="Vide la base de patrons avant d'y ajouter le fichier d'analyse")
+    parser.add_argument("--type", type=str, default="", help="Avec --base, seulement les patrons de ce type (ex. N_obj_V)")
+    parser.add_argument("--source", type=str, default="", help="Avec --base, seulement les items des flux dont le nom contient ce texte")
+    parser.add_argument("-dd", "--date-debut", type=str, default="", help="Avec --base, items publiés à partir de cette date (AAAA-MM-JJ)")
+    parser.add_argument("-df", "--date-fin", type=str, default="", help="Avec --base, items publiés jusqu'à cette date (AAAA-MM-JJ)")
+    parser.add_argument("--metriques", type=str, required=False, help="Fichier JSON du rapport de mesures (durée des étapes, compteurs), '-' pour la sortie d'erreur")
+    parser.add_argument("--profile", action='store_true', help="Ajoute au rapport de mesures un profil cProfile et tracemalloc")
     args = parser.parse_args()
-
-    # Identifier le format du fichier d'analyse pour appliquer la bonne fonction de lecture
-    corpus_analyse = load_file(args.input_file)
-
-    # Extraire tous les patrons
-    tous_les_patrons = all_patterns(corpus_analyse)
-
-    # Trier les patrons et compter les instances de chaque patron
-    tous_les_patrons_str = patron_to_string(tous_les_patrons)
-    patrons_avec_comptes = compte_instances(tous_les_patrons_str)
-
-    # Convertir tous les patrons sous forme d'une liste de listes de str
-    liste_patrons = []
-    for patron_str in patrons_avec_comptes :
-        patron_liste = patron_str.split(", ")
-        liste_patrons.append(patron_liste)
-
-    # Afficher les patrons simples en tableau
-    tableau(liste_patrons)
-
-    # Ecrire les patrons dans un fichier csv
-    ecriture_csv(args.output_file, liste_patrons)
-
+    if args.metriques or args.profile:
+        mesures.activer(args.metriques, args.profile)
+    specs = PATRONS_DEFAUT + (load_specs(args.patrons) if args.patrons else [])
+
+    if args.base:
+        from base_patrons import BasePatrons, rapport_fusion
+        base = BasePatrons(args.base, args.reconstruire_base)
+        if args.input_file != '-':
+            with mesures.etape("chargement"):
+                corpus_analyse = load_file(args.input_file)
+            mesures.compter("items", sum(len(item_list) for item_list in corpus_analyse.items))
+            with mesures.etape("fusion"):
+                nb_items, nb_patrons = base.fusionner(corpus_analyse, specs)
+            rapport_fusion(nb_items, nb_patrons)
+            mesures.compter("items_nouveaux", nb_items)
+            mesures.compter("occurrences_patrons", nb_patrons)
+        with mesures.etape("patrons"):
+            liste_patrons = base.meilleurs(args.top, args.type, args.source, args.date_debut, args.date_fin)
+        base.close()
+    else:
+        # Identifier le format du fichier d'analyse pour appliquer la bonne fonction de lecture
+        with mesures.etape("chargement"):
+            corpus_analyse = load_file(args.input_file)
+        mesures.compter("items", sum(len(item_list) for item_list in corpus_analyse.items))
+
+        # Extraire et compter tous les patrons
+        with mesures.etape("patrons"):
+            compteur = compte_patrons(corpus_analyse, specs)
+            liste_patrons = meilleurs_patrons(compteur, args.top)
+        mesures.compter("patrons_distincts", len(compteur))
+        mesures.compter("occurrences_patrons", sum(compteur.values()))
+
+    with mesures.etape("ecriture"):
+        # Afficher les patrons simples en tableau
+        tableau(liste_patrons)
+
+        # Ecrire les patrons dans un fichier csv
+        ecriture_csv(args.output_file, liste_patrons)
 
 
 if __name__ == "__main__":
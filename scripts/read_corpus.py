@@ -2,6 +2,14 @@
 LES EXEMPLES D'UTILISATION :
 
 
+Chercher des articles par mots (BM25 sur titres et descriptions ; l'index ./Corpus.bm25 est complété
+avec les nouveaux snapshots à chaque recherche) :
+python3 read_corpus.py -o recherche -m re ./Corpus -q "réforme des retraites" -k 10
+
+Garder le corpus en mémoire et l'interroger sans tout reparser à chaque fois :
+python3 read_corpus.py -o serve -m re ./Corpus
+python3 read_corpus.py -o client -src bfm -dd 2024-01-29 -f json
+
 POUR LE PIPE 
 python3 read_corpus.py -o parcours -m et -cat "Transferts" -f xml  ./corpus --stdout | python3 analyzers.py --output ./output.xml --method trankit --stdin --f xml
 
@@ -29,9 +37,10 @@ import sys
 import rss_reader
 import rss_parcours
 import datastructures
+import mesures
+from cache_parsing import CacheParsing
 from pathlib import Path
-from analyzers import all_items_trankit, all_items_spacy, all_items_stanza, save_corpus, load_corpus
-import sys
+from analyzers import load_corpus
 
 
 def parse_files(file, role):
@@ -39,33 +48,76 @@ def parse_files(file, role):
         Choix de la méthode en fonction de l'argument donné lors du lancement du programme depuis le terminal.
         Prend en entré le fichier xml et la méthode utilisée.
     """
-    if role == "re":
-        return rss_reader.with_re(file)
-    elif role == "et":
-        return rss_reader.with_et(file)
-    elif role == "fp":
-        return rss_reader.with_feedparser(file)
+    lecteur = rss_reader.LECTEURS.get(role)
+    if lecteur is not None:
+        return lecteur(file)
+
+def lire_filtres(args) -> dict:
+    """
+        Construit le dictionnaire des filtres (dates, source, catégories) à partir des arguments.
+    """
+    filtres = {}
+    filtres["categories"] = []
+    filtres["source"] = ''
+    filtres["date"] = ['','']
+    if args.date_debut:
+        filtres["date"][0] = args.date_debut
+    if args.date_fin:
+        filtres["date"][1] = args.date_fin
+    if args.source:
+        filtres["source"] = args.source
+    if args.category:
+        categories = args.category.split()
+        for category in categories:
+            filtres["categories"].append(category)
+    return filtres
+
+def indexer_flux(flux, index_corpus):
+    """
+        Ajoute chaque liste d'items à l'index au passage, sans garder le corpus en mémoire.
+    """
+    for items in flux:
+        index_corpus.ajouter([items])
+        yield items
 
 def main():
     parser = argparse.ArgumentParser(prog="Récupérateur d'arguments")
-    parser.add_argument("Path", type=str)
-    parser.add_argument("-o", "--order", dest="order", help="Choix des ordres", type=str, choices=["reader", "parcours", "load"])
-    parser.add_argument("-m", "--method", dest="method", help="Choix de la methode", type=str, choices=["re", "et", "fp"])
+    parser.add_argument("Path", type=str, nargs="?", default="", help="Arborescence ou fichier de corpus (inutile pour l'ordre client)")
+    parser.add_argument("-o", "--order", dest="order", help="Choix des ordres", type=str, choices=["reader", "parcours", "load", "serve", "client", "recherche"])
+    parser.add_argument("-m", "--method", dest="method", help="Choix de la methode", type=str, choices=list(rss_reader.LECTEURS))
     parser.add_argument('-dd', '--date_debut', help='Heure de début.', required=False)
     parser.add_argument('-df', '--date_fin', help='Heure de fin.', required=False)
     parser.add_argument('-src', '--source', help='Source de l\'article.', required=False)
     parser.add_argument('-cat', '--category', help='Catégorie de l\'article.', required=False)
-    parser.add_argument("-f", "--format", dest="format", help="Choix du format pour sauvegarder et recharger", type=str, choices=["xml", "json", "pickle"], required=False)
+    parser.add_argument("-f", "--format", dest="format", help="Choix du format pour sauvegarder et recharger", type=str, choices=["xml", "json", "jsonl", "pickle"], required=False)
     parser.add_argument('-s', '--savePath', type=str, required=False)
     parser.add_argument("--stdout", action='store_true', help="Permet de faire passer le résultat du programme dans analyzers.py")
+    parser.add_argument("--dedup", action='store_true', help="Ne garde qu'une occurrence de chaque item (source, titre, date) d'un snapshot à l'autre")
+    parser.add_argument("--index_vus", type=str, required=False, help="Fichier des empreintes déjà vues : seuls les items nouveaux depuis le dernier lancement sont gardés (implique --dedup). Seuls les items émis, après les filtres, y sont enregistrés")
+    parser.add_argument("--cache", type=str, required=False, help="Base sqlite du cache de parsing : seuls les fichiers nouveaux ou modifiés sont re-parsés")
+    parser.add_argument("--rebuild-cache", dest="rebuild_cache", action='store_true', help="Vide le cache de parsing avant le parcours")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Nombre de processus pour parser les fichiers en parallèle (ordre parcours)")
+    # valeurs par défaut définies dans serveur.py seulement, qui n'est importé que pour serve et client
+    parser.add_argument("--host", type=str, default=None, help="Adresse du serveur (ordres serve et client, par défaut serveur.HOTE_DEFAUT)")
+    parser.add_argument("--port", type=int, default=None, help="Port du serveur (ordres serve et client, par défaut serveur.PORT_DEFAUT)")
+    parser.add_argument("--intervalle", type=float, default=60.0, help="Secondes entre deux recherches de nouveaux snapshots (ordre serve, 0 pour ne pas surveiller)")
+    parser.add_argument("-q", "--requete", type=str, required=False, help="Mots recherchés dans les titres et descriptions (ordre recherche)")
+    parser.add_argument("-k", "--top", type=int, default=10, help="Nombre de résultats de la recherche (ordre recherche)")
+    parser.add_argument("--metriques", type=str, required=False, help="Fichier JSON du rapport de mesures (durée des étapes, compteurs, latences de parse), '-' pour la sortie d'erreur")
+    parser.add_argument("--profile", action='store_true', help="Ajoute au rapport de mesures un profil cProfile et tracemalloc")
     args = parser.parse_args()
+    if args.metriques or args.profile:
+        mesures.activer(args.metriques, args.profile)
 
     if not args.order:
-        sys.exit("Erreur : Il faut indiquer un ordre: reader ou parcours.")
+        sys.exit("Erreur : Il faut indiquer un ordre: reader, parcours, load, serve, client ou recherche.")
 
     else:
         chemin = args.Path
         method = args.method
+        # seul l'ordre client n'a pas besoin de chemin : il interroge le serveur
+        if not chemin and args.order != "client":
+            sys.exit("Erreur : Il faut indiquer le chemin de l'arborescence ou du corpus.")
 
         if args.order == "reader":
             if args.method:
@@ -75,55 +127,101 @@ def main():
                 sys.exit("Erreur : Il faut indiquer une methode de parsing.")
 
         elif args.order == "parcours":
-            filtres = {}
-            filtres["categories"] = []
-            filtres["source"] = ''
-            filtres["date"] = ['','']
-            if args.date_debut:
-                filtres["date"][0] = args.date_debut
-            if args.date_fin:
-                filtres["date"][1] = args.date_fin
-            if args.source:
-                filtres["source"] = args.source
-            if args.category:
-                categories = args.category.split()
-                for category in categories:
-                    filtres["categories"].append(category)
-
-            corpus = rss_parcours.parcours_arborescence(chemin, method, filtres)
+            filtres = lire_filtres(args)
+
+            if args.format in ("xml", "json", "jsonl") and (args.savePath or args.stdout):
+                # chaîne en flux : chaque fichier est parsé, filtré et écrit avant de passer au suivant
+                flux = rss_parcours.parcours_flux(chemin, method, filtres, args.workers, args.dedup, args.index_vus,
+                                                  args.cache, args.rebuild_cache)
+                ecrire = {"xml": datastructures.write_xml, "json": datastructures.write_json,
+                          "jsonl": datastructures.write_jsonl}[args.format]
+                with mesures.etape("ecriture"):
+                    if args.savePath:
+                        index_corpus = rss_parcours.IndexCorpus([])
+                        with open(args.savePath, "w", encoding="utf-8") as sortie:
+                            ecrire(mesures.flux("index", indexer_flux(flux, index_corpus)), sortie)
+                        # index inversés enregistrés à côté du corpus, pour les filtrages suivants (ordre load)
+                        rss_parcours.save_index(index_corpus, rss_parcours.chemin_index(args.savePath))
+                    elif args.format == "xml":
+                        ecrire(flux, sys.stdout, xml_declaration=False)
+                    elif args.format == "json":
+                        ecrire(flux, sys.stdout)
+                        print()
+                    else:
+                        ecrire(flux, sys.stdout)
+                return
+
+            corpus = rss_parcours.parcours_arborescence(chemin, method, filtres, args.workers, args.dedup, args.index_vus,
+                                                        args.cache, args.rebuild_cache)
     
             if args.savePath: 
                 chemin_save = args.savePath
+                with mesures.etape("index"):
+                    index_corpus = rss_parcours.IndexCorpus(corpus.items)
  
-                if args.format == "xml":
-                    corpus = datastructures.save_xml(corpus, chemin_save)
-                elif args.format == "json":
-                    corpus = datastructures.save_json(corpus, chemin_save)
-                elif args.format == "pickle":
-                    corpus = datastructures.save_pickle(corpus, chemin_save)
+                with mesures.etape("ecriture"):
+                    if args.format == "pickle":
+                        corpus = datastructures.save_pickle(corpus, chemin_save)
+                    # index inversés enregistrés à côté du corpus, pour les filtrages suivants (ordre load)
+                    rss_parcours.save_index(index_corpus, rss_parcours.chemin_index(chemin_save))
 
             elif args.stdout:
-                if args.format == "xml":
-                    corpus = datastructures.save_xml(corpus, sys.stdout)
-                    # print(corpus)
-                elif args.format == "json":
-                    corpus = datastructures.save_json(corpus, sys.stdout)
-                elif args.format == "pickle":
-                    corpus = datastructures.save_pickle(corpus, sys.stdout)
+                with mesures.etape("ecriture"):
+                    if args.format == "pickle":
+                        corpus = datastructures.save_pickle(corpus, sys.stdout)
 
 
         elif args.order == "load":
             if not args.format:
-                sys.exit("Erreur : Il faut indiquer un format pout recharger: xml, json ou pickle.")
-            elif args.format == "xml":
-                corpus = load_corpus(chemin)
-                #print(corpus)
-            elif args.format == "json":
-                corpus = load_corpus(chemin)
-                print(corpus)
-            elif args.format == "pickle":
+                sys.exit("Erreur : Il faut indiquer un format pout recharger: xml, json, jsonl ou pickle.")
+            with mesures.etape("chargement"):
                 corpus = load_corpus(chemin)
+            filtres = lire_filtres(args)
+            if filtres["categories"] or filtres["source"] or filtres["date"][0] or filtres["date"][1]:
+                # les filtres sont résolus par les index enregistrés à côté du corpus (reconstruits s'ils manquent)
+                with mesures.etape("index"):
+                    index_corpus = rss_parcours.index_du_corpus(corpus.items, chemin)
+                with mesures.etape("filtre"):
+                    corpus = rss_parcours.check_filtres(corpus.items, filtres, index_corpus)
+            if args.format in ("json", "jsonl", "pickle"):
                 print(corpus)
 
+        elif args.order == "serve":
+            import serveur
+            if not args.method:
+                sys.exit("Erreur : Il faut indiquer une methode de parsing.")
+            serveur.serve(chemin, method, args.host or serveur.HOTE_DEFAUT, args.port or serveur.PORT_DEFAUT,
+                          args.workers, args.cache, args.intervalle)
+
+        elif args.order == "client":
+            from urllib.error import HTTPError, URLError
+            import serveur
+            args.host = args.host or serveur.HOTE_DEFAUT
+            args.port = args.port or serveur.PORT_DEFAUT
+            try:
+                reponse = serveur.client(lire_filtres(args), args.format or "json", args.host, args.port)
+            except HTTPError as erreur:
+                sys.exit(f"Erreur : le serveur a refusé la requête ({erreur.code} {erreur.reason}).")
+            except URLError as erreur:
+                sys.exit(f"Erreur : impossible de joindre le serveur sur {args.host}:{args.port} ({erreur.reason}).")
+            sys.stdout.buffer.write(reponse)
+
+        elif args.order == "recherche":
+            import recherche
+            if not args.requete:
+                sys.exit("Erreur : Il faut indiquer une requête (-q).")
+            if Path(chemin).is_dir() and not method:
+                sys.exit("Erreur : Il faut indiquer une methode de parsing.")
+            with mesures.etape("index"):
+                cache = CacheParsing(args.cache, reconstruire=args.rebuild_cache) if args.cache else None
+                try:
+                    index = recherche.index_recherche(chemin, method, args.workers, cache)
+                finally:
+                    if cache is not None:
+                        cache.close()
+            with mesures.etape("recherche"):
+                resultats = index.rechercher(args.requete, args.top)
+            recherche.afficher_resultats(index, resultats)
+
 if __name__ == "__main__":
     main()
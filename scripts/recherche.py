@@ -0,0 +1,159 @@
+import heapq
+import math
+import pickle
+import re
+import sys
+from array import array
+from pathlib import Path
+from typing import List, Tuple
+import rss_parcours
+from datastructures import Item, interner
+
+"""
+Recherche plein texte (ordre recherche de read_corpus.py) :
+- index inversé sur les mots des titres et descriptions : pour chaque terme, un array des numéros
+  de documents et un array des fréquences du terme dans chaque document
+- classement BM25, et les k meilleurs documents sont gardés avec un tas (heapq.nlargest)
+- l'index est enregistré à côté du corpus (<corpus>.bm25) et mis à jour à chaque recherche avec les
+  fichiers des nouveaux snapshots seulement ; un article déjà indexé (même source, titre et date)
+  n'est pas indexé une seconde fois
+"""
+
+# paramètres habituels de BM25
+K1 = 1.2
+B = 0.75
+
+BALISES_RE = re.compile(r"<!\[CDATA\[|\]\]>|<[^>]*>")
+MOT_RE = re.compile(r"\w+")
+
+
+def tokeniser(texte) -> List[str]:
+    if not texte:
+        return []
+    return MOT_RE.findall(BALISES_RE.sub(" ", str(texte)).lower())
+
+
+def chemin_recherche(chemin_corpus) -> str:
+    return str(chemin_corpus).rstrip("/") + ".bm25"
+
+
+class IndexRecherche:
+    def __init__(self):
+        self.termes = {}            # terme -> numéro du terme
+        self.documents = []         # numéro du terme -> array des numéros de documents (croissants)
+        self.frequences = []        # numéro du terme -> array des fréquences, alignées sur documents
+        self.longueurs = array("I")
+        self.total_longueurs = 0
+        # de quoi afficher un résultat sans recharger le corpus : (source, date, titre) par document
+        self.resumes = []
+        self.empreintes = set()
+        self.fichiers = set()
+
+    @property
+    def nb_documents(self) -> int:
+        return len(self.longueurs)
+
+    def ajouter_item(self, item: Item) -> bool:
+        """
+        Indexe l'item s'il n'a pas déjà été indexé. Renvoie True s'il a été ajouté.
+        """
+        empreinte = rss_parcours.empreinte_item(item)
+        if empreinte in self.empreintes:
+            return False
+        self.empreintes.add(empreinte)
+        numero = self.nb_documents
+        mots = tokeniser(item.title) + tokeniser(item.description)
+        frequences = {}
+        for mot in mots:
+            frequences[mot] = frequences.get(mot, 0) + 1
+        for mot, frequence in frequences.items():
+            terme = self.termes.get(mot)
+            if terme is None:
+                terme = self.termes[mot] = len(self.documents)
+                self.documents.append(array("I"))
+                self.frequences.append(array("H"))
+            self.documents[terme].append(numero)
+            self.frequences[terme].append(min(frequence, 0xFFFF))
+        self.longueurs.append(len(mots))
+        self.total_longueurs += len(mots)
+        self.resumes.append((interner(item.source), item.pubDate, item.title))
+        return True
+
+    def ajouter(self, corpus: List[List[Item]]) -> int:
+        nb_ajoutes = 0
+        for file in corpus:
+            for item in file:
+                nb_ajoutes += self.ajouter_item(item)
+        return nb_ajoutes
+
+    def mise_a_jour(self, chemin_corpus, method: str, workers: int = 1, cache=None) -> int:
+        """
+        Parse et indexe les fichiers de l'arborescence qui ne sont pas encore dans l'index.
+        Renvoie le nombre de nouveaux fichiers.
+        """
+        nouveaux = [f for f in rss_parcours.load_corpus(chemin_corpus) if str(f) not in self.fichiers]
+        if not nouveaux:
+            return 0
+        for items in rss_parcours.parse_flux(nouveaux, method, workers, cache=cache):
+            self.ajouter([items])
+        self.fichiers.update(str(f) for f in nouveaux)
+        return len(nouveaux)
+
+    def rechercher(self, requete: str, k: int = 10) -> List[Tuple[float, int]]:
+        """
+        Renvoie les k documents les plus pertinents pour la requête, (score BM25, numéro du document),
+        du meilleur au moins bon.
+        """
+        if not self.nb_documents:
+            return []
+        longueur_moyenne = self.total_longueurs / self.nb_documents or 1.0
+        scores = {}
+        for mot in set(tokeniser(requete)):
+            terme = self.termes.get(mot)
+            if terme is None:
+                continue
+            documents = self.documents[terme]
+            idf = math.log(1 + (self.nb_documents - len(documents) + 0.5) / (len(documents) + 0.5))
+            longueurs = self.longueurs
+            for numero, frequence in zip(documents, self.frequences[terme]):
+                normalisation = K1 * (1 - B + B * longueurs[numero] / longueur_moyenne)
+                scores[numero] = scores.get(numero, 0.0) + idf * frequence * (K1 + 1) / (frequence + normalisation)
+        return [(score, numero) for numero, score in heapq.nlargest(k, scores.items(), key=lambda couple: couple[1])]
+
+
+def save_recherche(index: IndexRecherche, chemin) -> None:
+    with open(chemin, "wb") as fichier:
+        pickle.dump(index, fichier, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_recherche(chemin) -> IndexRecherche:
+    with open(chemin, "rb") as fichier:
+        return pickle.load(fichier)
+
+
+def index_recherche(chemin_corpus, method: str, workers: int = 1, cache=None) -> IndexRecherche:
+    """
+    Recharge l'index enregistré à côté du corpus et le complète avec les fichiers nouveaux
+    (arborescence de flux), ou avec le corpus sauvegardé s'il a changé depuis (fichier xml, json, jsonl, pkl, rsscol).
+    L'index est réenregistré s'il a changé.
+    """
+    chemin = Path(chemin_recherche(chemin_corpus))
+    index = load_recherche(chemin) if chemin.exists() else IndexRecherche()
+    if Path(chemin_corpus).is_dir():
+        modifie = index.mise_a_jour(chemin_corpus, method, workers, cache) > 0
+    else:
+        modifie = not chemin.exists() or chemin.stat().st_mtime < Path(chemin_corpus).stat().st_mtime
+        if modifie:
+            from analyzers import load_corpus
+            index = IndexRecherche()
+            index.ajouter(load_corpus(chemin_corpus).items)
+    if modifie:
+        save_recherche(index, chemin)
+    return index
+
+
+def afficher_resultats(index: IndexRecherche, resultats, sortie=sys.stdout) -> None:
+    for score, numero in resultats:
+        source, pub_date, titre = index.resumes[numero]
+        titre = " ".join(BALISES_RE.sub(" ", str(titre or "")).split())
+        sortie.write(f"{score:.3f}\t{pub_date or ''}\t{source or ''}\t{titre}\n")
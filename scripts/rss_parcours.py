@@ -1,18 +1,29 @@
 from pathlib import Path
 from typing import List, Dict
+from multiprocessing import Pool
+from array import array
+from bisect import bisect_left, bisect_right
 import datetime
+import hashlib
+import pickle
+import sys
+import time
 import rss_reader
+import mesures
+from cache_parsing import CacheParsing
 from datastructures import Item, Corpus
 
 """
 Ici les fonctions utilisées pour parcourir l'arborescence, et filtrer les documents retournés (semaine 5):
-- filtre_dates pour filtrer selon des dates (r1)
-- filtre_source pour filtrer selon des sources (r2)
-- filtre_categories pour filtrer selon des categories (r3)
-Et une fonction pour les appeler : check_filtres() qui va vérifier chacun des
-filtres et retourner une liste ne contenant que les fichiers demandés.
-- des fonctions complémentaires à celles des filtres (dont les filtres ont besoin)
+- ReglesFiltres, les règles des filtres selon des dates (r1), des sources (r2) et des categories (r3),
+    avec les fonctions dont elles ont besoin (date_utilisateur, jour_pubdate)
+- check_filtres() qui applique les filtres et retourne une liste ne contenant que les fichiers demandés
+- des index (IndexDates, IndexCorpus) utilisés par check_filtres pour résoudre les filtres
+    par intersection d'ensembles, enregistrés à côté du corpus (save_index, index_du_corpus)
+- predicat_filtres et filtrer_flux, qui appliquent les mêmes règles item par item dans la chaîne en flux
 - une fonction load_corpus pour charger un corpus 
+- des fonctions de dédoublonnage (empreinte_item, dedoublonner) pour ne garder que les items
+    jamais vus, d'un snapshot à l'autre, à l'aide d'un index persistant sur disque
 - une fonction parcours_arborescence qui permettra de parcourir l'arborescence et d'afficher, 
     selon les filtres (fournis par l'utilsateur, et qui serviront de paramètres à la fonction), les articles correspondants  
 """
@@ -20,60 +31,30 @@ filtres et retourner une liste ne contenant que les fichiers demandés.
 
 def load_corpus(path: str):
     current = Path(path)
-    return current.rglob("*.xml")   # On va devoir retourner un corpus
+    # tri des chemins pour que l'ordre de sortie soit le même d'un lancement à l'autre
+    return sorted(current.rglob("*.xml"))   # On va devoir retourner un corpus
 
 
 
-def check_filtres(corpus: List[List[Item]], filtres: Dict) -> Corpus:
+def check_filtres(corpus: List[List[Item]], filtres: Dict, index: "IndexCorpus" = None) -> Corpus:
     if not filtres["categories"] and not filtres["date"] and not filtres["source"]:
-        return corpus
+        return Corpus(items=corpus)
+    # les filtres sont résolus une seule fois pour tout le corpus, par intersection des index
+    if index is None:
+        index = IndexCorpus(corpus)
+    numeros = index.requete(filtres)
     filtered = Corpus(items=[])
+    numero = 0
     for file in corpus:
         items = []
         for item in file:
-            if filtre_categories(item, filtres["categories"]) and filtre_date(item, filtres["date"]) and filtre_source(item, filtres["source"]):
+            if numeros is None or numero in numeros:
                 items.append(item)
+            numero += 1
         if items:
             filtered.items.append(items)
     return filtered
 
-# Role 1 s5
-def filtre_date(item: Item, user_dates: List[str]) -> bool:
-    """
-    Cette fonction normalise les dates des fichiers, récupère les dates fournies par l'utilisateur,
-    et sélectionne les fichiers dont la date de publication est comprise entre les dates spécifiées par l'utilisateur.
-    """
-    if not user_dates[0] and not user_dates[1]:
-        return True
-    if not item.pubDate:
-        return False
-    date_normalisee = normaliser_date(item)
-    date_debut, date_fin = date_utilisateur(user_dates)
-    statut_date = selection_date(date_normalisee, date_debut, date_fin)
-    return statut_date
-
-def normaliser_date(item: Item) -> Item:
-    """
-    Cette fonction permet de normaliser le format de date pour tous les fichiers. Transforme la date en objet datetime pour pouvoir l'utiliser plus tard.
-    """
-    # liste des 3 formats possibles trouvés dans les fichiers
-    formats = [
-        "%a, %d %b %Y %H:%M:%S %Z",
-        "%a, %d %b %Y %H:%M:%S %z",
-        "%Y-%m-%dT%H:%M:%S%z",
-    ]
-    pubDate = item.pubDate
-    # transformation de la date -> essai sur les 3 formats possibles
-    for format_date in formats:
-        try:
-            pubDatetime = datetime.datetime.strptime(pubDate, format_date)
-            formatOK = pubDatetime.date()
-            item.pubDate = formatOK  # nouvelle date dans le dico
-            break
-        except ValueError:
-            continue
-    return item     # On va devoir retourner un objet item
-
 
 def date_utilisateur(user_dates:List[str]):
     """
@@ -88,61 +69,440 @@ def date_utilisateur(user_dates:List[str]):
     return date_debut, date_fin
 
 
-def selection_date(item, date_debut, date_fin):
+# Index des dates : chaque pubDate est convertie une seule fois en entier (numéro de jour,
+# date.toordinal()), et les items sont triés par date pour répondre à un intervalle par bisect.
+
+FORMATS_DATE = [
+    "%a, %d %b %Y %H:%M:%S %Z",
+    "%a, %d %b %Y %H:%M:%S %z",
+    "%Y-%m-%dT%H:%M:%S%z",
+]
+# format qui a fonctionné en dernier pour chaque source : un flux utilise toujours le même
+_format_par_source = {}
+
+
+def jour_pubdate(pubDate, source=None):
     """
-    Cette fonction sélectionne les fichiers dont la date de publication est comprise entre la date de début et la date de fin (si spécifiées) par l'utilisateur.
-    Si seulement date de début, on sélectionne les fichiers après cette date.
-    Si seulement date de fin, on sélectionne les fichiers avant cette date.
+    Renvoie le numéro de jour (date.toordinal()) de la date de publication, ou None si elle n'est pas reconnue.
+    Le format trouvé pour la source est essayé en premier lors des appels suivants.
     """
-    date_article = item.pubDate
-    if not date_debut and not date_fin:
-        return True
-    if date_debut and date_fin:
-        return date_debut <= date_article <= date_fin
-    if date_debut:
-        return date_debut <= date_article
-    if date_fin:
-        return date_fin >= date_article
-    return False
-
-# Rôle 2 s5
-def filtre_source(item: Item, source) -> bool:
-    if not source:
-        return True
-    if not item.source:
-        return False
-    if source.lower() in str(item.source).lower():
+    if not pubDate:
+        return None
+    if isinstance(pubDate, datetime.date):
+        return pubDate.toordinal()
+    format_connu = _format_par_source.get(source)
+    formats = FORMATS_DATE if format_connu is None else [format_connu] + [f for f in FORMATS_DATE if f != format_connu]
+    for format_date in formats:
+        try:
+            jour = datetime.datetime.strptime(pubDate, format_date).date().toordinal()
+        except ValueError:
+            continue
+        _format_par_source[source] = format_date
+        return jour
+    return None
+
+
+class ReglesFiltres:
+    """
+    Règles des filtres -src, -cat, -dd et -df, préparées une seule fois (source et catégories en minuscules,
+    dates de l'utilisateur en numéros de jour). Elles servent aux deux façons de filtrer : item par item
+    dans la chaîne en flux (garder), et par les clés des index dans IndexCorpus.requete.
+    """
+    def __init__(self, filtres: Dict):
+        date_debut, date_fin = date_utilisateur(filtres["date"]) if filtres["date"] else (None, None)
+        self.jour_debut = date_debut.toordinal() if date_debut else None
+        self.jour_fin = date_fin.toordinal() if date_fin else None
+        self.source = filtres["source"].lower() if filtres["source"] else ""
+        self.categories = {category.lower() for category in filtres["categories"]}
+
+    @property
+    def dates(self) -> bool:
+        return self.jour_debut is not None or self.jour_fin is not None
+
+    def source_ok(self, source) -> bool:
+        # la source demandée est contenue dans le nom du fichier, sans tenir compte de la casse
+        return bool(source) and self.source in str(source).lower()
+
+    def categorie_ok(self, category) -> bool:
+        return bool(category) and category.lower() in self.categories
+
+    def jour_ok(self, jour) -> bool:
+        if jour is None:
+            return False
+        if self.jour_debut is not None and jour < self.jour_debut:
+            return False
+        if self.jour_fin is not None and jour > self.jour_fin:
+            return False
         return True
-    return False
 
-# Rôle 3 s5
-def filtre_categories(item: Item, categories: list) -> bool:
-    if not categories:
+    def garder(self, item: Item) -> bool:
+        if self.source and not self.source_ok(item.source):
+            return False
+        # au moins une des catégories demandées
+        if self.categories and not any(self.categorie_ok(category) for category in item.category or []):
+            return False
+        if self.dates and not self.jour_ok(jour_pubdate(item.pubDate, item.source)):
+            return False
         return True
-    if not item.category:
-        return False
-    for category in categories:
-        if category.lower() in [cat.lower() for cat in item.category]:
-            return True
-    return False
 
 
+class IndexDates:
+    """
+    Index trié (numéro de jour -> numéro d'item dans l'ordre du corpus), construit une fois par corpus.
+    """
+    def __init__(self, corpus: List[List[Item]]):
+        self.jours = array("l")
+        self.numeros = array("l")
+        self.ajouter(corpus, 0)
+
+    def ajouter(self, corpus: List[List[Item]], numero: int) -> None:
+        """
+        Ajoute à l'index les items d'un nouveau morceau de corpus, numérotés à partir de numero.
+        Le tri est fait à la prochaine sélection : ajouter les fichiers un par un reste linéaire.
+        """
+        for file in corpus:
+            for item in file:
+                jour = jour_pubdate(item.pubDate, item.source)
+                if jour is not None:
+                    self.jours.append(jour)
+                    self.numeros.append(numero)
+                numero += 1
+        self.trie = False
+
+    def trier(self) -> None:
+        if getattr(self, "trie", True):
+            return
+        couples = sorted(zip(self.jours, self.numeros))
+        self.jours = array("l", (jour for jour, _ in couples))
+        self.numeros = array("l", (numero for _, numero in couples))
+        self.trie = True
+
+    def selection(self, jour_debut=None, jour_fin=None) -> set:
+        """
+        Renvoie les numéros des items publiés entre les jours jour_debut et jour_fin
+        (numéros de jour, bornes incluses, chacune optionnelle) : ReglesFiltres.jour_ok par bisect.
+        """
+        self.trier()
+        debut = bisect_left(self.jours, jour_debut) if jour_debut is not None else 0
+        fin = bisect_right(self.jours, jour_fin) if jour_fin is not None else len(self.jours)
+        return set(self.numeros[debut:fin])
+
+class IndexCorpus:
+    """
+    Index inversés d'un corpus (source normalisée -> numéros d'items, catégorie normalisée -> numéros d'items)
+    et index des dates. Les numéros d'items suivent l'ordre du corpus. Une requête combinant
+    -cat, -src, -dd et -df se résout par intersection d'ensembles, sans reparcourir les items.
+    """
+    def __init__(self, corpus: List[List[Item]]):
+        self.dates = IndexDates([])
+        self.sources = {}
+        self.categories = {}
+        self.nb_items = 0
+        self.ajouter(corpus)
+
+    def ajouter(self, corpus: List[List[Item]]) -> None:
+        """
+        Ajoute à l'index les items d'un nouveau morceau de corpus, placés à la suite des items déjà indexés.
+        """
+        self.dates.ajouter(corpus, self.nb_items)
+        numero = self.nb_items
+        for file in corpus:
+            for item in file:
+                if item.source:
+                    self.sources.setdefault(str(item.source).lower(), array("l")).append(numero)
+                for category in {cat.lower() for cat in item.category or [] if cat}:
+                    self.categories.setdefault(category, array("l")).append(numero)
+                numero += 1
+        self.nb_items = numero
+
+    def selection_source(self, regles: ReglesFiltres) -> set:
+        # les clés de l'index sont les sources (en minuscules) : la règle est testée une fois par source
+        numeros = set()
+        for nom, postings in self.sources.items():
+            if regles.source_ok(nom):
+                numeros.update(postings)
+        return numeros
+
+    def selection_categories(self, regles: ReglesFiltres) -> set:
+        numeros = set()
+        for category, postings in self.categories.items():
+            if regles.categorie_ok(category):
+                numeros.update(postings)
+        return numeros
+
+    def requete(self, filtres: Dict):
+        """
+        Renvoie l'ensemble des numéros d'items qui passent tous les filtres, ou None s'il n'y a aucun filtre.
+        """
+        regles = ReglesFiltres(filtres)
+        selections = []
+        if regles.source:
+            selections.append(self.selection_source(regles))
+        if regles.categories:
+            selections.append(self.selection_categories(regles))
+        if regles.dates:
+            selections.append(self.dates.selection(regles.jour_debut, regles.jour_fin))
+        if not selections:
+            return None
+        selections.sort(key=len)
+        return selections[0].intersection(*selections[1:])
+
+
+def save_index(index: IndexCorpus, chemin) -> None:
+    index.dates.trier()
+    with open(chemin, "wb") as fichier:
+        pickle.dump(index, fichier, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_index(chemin) -> IndexCorpus:
+    with open(chemin, "rb") as fichier:
+        return pickle.load(fichier)
+
+
+def chemin_index(chemin_corpus) -> str:
+    """
+    Les index sont enregistrés à côté du corpus sauvegardé, avec l'extension .idx en plus.
+    """
+    return str(chemin_corpus) + ".idx"
+
+
+def index_du_corpus(corpus: List[List[Item]], chemin_corpus) -> IndexCorpus:
+    """
+    Recharge l'index enregistré à côté du corpus s'il est à jour, sinon le reconstruit et l'enregistre.
+    """
+    chemin = Path(chemin_index(chemin_corpus))
+    nb_items = sum(len(file) for file in corpus)
+    if chemin.exists() and chemin.stat().st_mtime >= Path(chemin_corpus).stat().st_mtime:
+        index = load_index(chemin)
+        if index.nb_items == nb_items:
+            return index
+    index = IndexCorpus(corpus)
+    save_index(index, chemin)
+    return index
+
 # NGAUV Nicolas s6
 
-def parse_files(files, method):
-    parsed_corpus = []
+def parse_file(file, method) -> List[Item]:
+    lecteur = rss_reader.LECTEURS.get(method)
+    if lecteur is None:
+        return []
+    return lecteur(file)
+
+
+def parse_file_chrono(file, method):
+    """
+    Renvoie (items, durée du parse en secondes).
+    """
+    debut = time.perf_counter()
+    items = parse_file(file, method)
+    return items, time.perf_counter() - debut
+
+
+def _parse_file_worker(args):
+    """
+    Point d'entrée des processus du pool : Pool.imap ne passe qu'un seul argument.
+    La durée est mesurée dans le processus qui parse et renvoyée avec les items.
+    """
+    file, method = args
+    return parse_file_chrono(file, method)
+
+
+def _parse_sans_cache(files, method, workers: int, chunksize: int):
+    """
+    Parse les fichiers dans l'ordre, au fil de la demande (générateur).
+    La latence de chaque fichier est relevée par lecteur (mesures "parse.<méthode>").
+    """
+    if workers > 1 and len(files) > 1:
+        if chunksize <= 0:
+            # environ 4 paquets par processus pour équilibrer la charge, mais des paquets petits sur un
+            # gros corpus : ils fixent la taille des fenêtres, donc la mémoire
+            chunksize = max(1, min(len(files) // (workers * 4), 8))
+        # imap envoie toutes les tâches d'avance et garde les résultats finis tant qu'ils ne sont pas lus :
+        # les fichiers sont donnés au pool par fenêtres de 4 paquets par processus, pour que la mémoire
+        # dépende de la taille de la fenêtre et non de celle du corpus quand l'écriture est lente
+        taille_fenetre = workers * 4 * chunksize
+        with Pool(processes=workers) as pool:
+            for debut in range(0, len(files), taille_fenetre):
+                taches = [(file, method) for file in files[debut:debut + taille_fenetre]]
+                for items, duree in pool.imap(_parse_file_worker, taches, chunksize=chunksize):
+                    mesures.latence("parse." + method, duree)
+                    yield items
+    else:
+        for file in files:
+            items, duree = parse_file_chrono(file, method)
+            mesures.latence("parse." + method, duree)
+            yield items
+
+
+def parse_flux(files, method, workers: int = 1, chunksize: int = 0, cache=None):
+    """
+    Générateur qui renvoie les items fichier par fichier, dans l'ordre des fichiers, dès qu'ils sont parsés.
+    Avec workers > 1, les fichiers sont répartis par paquets de chunksize entre
+    plusieurs processus, par fenêtres de 4 paquets par processus ; imap garantit que l'ordre
+    de sortie est celui des fichiers.
+    Avec un cache (CacheParsing), seuls les fichiers absents du cache ou modifiés sont parsés.
+    Le débit est affiché quand tous les fichiers ont été renvoyés.
+    """
+    files = list(files)
+    debut = time.perf_counter()
+    nb_items = 0
+    if cache is None:
+        a_parser = files
+    else:
+        a_parser = [file for file in files if not cache.est_a_jour(file, method)]
+    nouveaux = _parse_sans_cache(a_parser, method, workers, chunksize)
+    a_parser = set(a_parser)
     for file in files:
-        if method == "re":
-            parsed_corpus.append(rss_reader.with_re(file))
-        if method == "et":
-            parsed_corpus.append(rss_reader.with_et(file))
-        if method == "fp":
-            parsed_corpus.append(rss_reader.with_feedparser(file))
-    return parsed_corpus
-
-def parcours_arborescence (chemin, method, filtres):    # Objet corpus à la place de chemin ?
-    files = load_corpus(chemin)
-    parsed_corpus = parse_files(files, method)
+        if cache is None:
+            items = next(nouveaux)
+        elif file in a_parser:
+            items = next(nouveaux)
+            cache.miss += 1
+            cache.put(file, method, items)
+        else:
+            items = cache.get(file, method)
+            if items is None:
+                # fichier modifié entre-temps
+                items = parse_file(file, method)
+                cache.put(file, method, items)
+        nb_items += len(items)
+        yield items
+    mesures.compter("fichiers", len(files))
+    mesures.compter("items_parses", nb_items)
+    rapport_debit(len(files), nb_items, time.perf_counter() - debut, workers)
+
+
+def parse_files(files, method, workers: int = 1, chunksize: int = 0, cache=None):
+    """
+    Parse tous les fichiers avec la méthode choisie (voir parse_flux) et renvoie la liste complète.
+    """
+    return list(parse_flux(files, method, workers, chunksize, cache))
+
+
+def rapport_debit(nb_fichiers: int, nb_items: int, duree: float, workers: int) -> None:
+    """
+    Affiche le débit du parsing sur la sortie d'erreur (la sortie standard peut servir au pipe).
+    """
+    duree = max(duree, 1e-9)
+    print(f"{nb_fichiers} fichiers, {nb_items} items en {duree:.2f}s avec {workers} processus : "
+          f"{nb_fichiers / duree:.1f} fichiers/s, {nb_items / duree:.1f} items/s", file=sys.stderr)
+
+# Dédoublonnage entre snapshots
+
+def empreinte_item(item: Item) -> str:
+    """
+    Calcule l'empreinte d'un item à partir de (source, titre, date de publication).
+    Les champs sont séparés par un caractère qui n'apparaît pas dans les flux.
+    """
+    contenu = "\x1f".join(str(champ or "") for champ in (item.source, item.title, item.pubDate))
+    return hashlib.blake2b(contenu.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def charger_index_vus(chemin_index) -> set:
+    """
+    Charge l'ensemble des empreintes déjà vues (une empreinte hexadécimale par ligne).
+    """
+    chemin_index = Path(chemin_index)
+    if not chemin_index.exists():
+        return set()
+    with open(chemin_index, "r", encoding="utf-8") as f:
+        return {ligne.strip() for ligne in f if ligne.strip()}
+
+
+def dedoublonner_flux(corpus, chemin_index=None):
+    """
+    Ne garde que la première occurrence de chaque item (les fichiers étant triés, c'est celle du plus
+    ancien snapshot). Si chemin_index est donné, les empreintes des lancements précédents sont
+    chargées depuis ce fichier et les nouvelles y sont ajoutées, pour que les lancements suivants
+    n'émettent que les items réellement nouveaux.
+    Le dédoublonnage se fait après les filtres : seuls les items effectivement émis sont enregistrés,
+    et un item écarté par les filtres d'un lancement pourra sortir lors d'un lancement avec d'autres filtres.
+    Générateur : les listes d'items sont traitées et renvoyées une par une.
+    """
+    vus = charger_index_vus(chemin_index) if chemin_index else set()
+    nouvelles = []
+    total = 0
+    for file in corpus:
+        items = []
+        for item in file:
+            total += 1
+            empreinte = empreinte_item(item)
+            if empreinte in vus:
+                continue
+            vus.add(empreinte)
+            nouvelles.append(empreinte)
+            items.append(item)
+        if items:
+            yield items
+    if chemin_index and nouvelles:
+        with open(chemin_index, "a", encoding="utf-8") as f:
+            f.write("\n".join(nouvelles) + "\n")
+    rapport_doublons(total, len(nouvelles))
+
+
+def dedoublonner(corpus: List[List[Item]], chemin_index=None) -> List[List[Item]]:
+    return list(dedoublonner_flux(corpus, chemin_index))
+
+
+def rapport_doublons(total: int, nouveaux: int) -> None:
+    ratio = (total - nouveaux) / total if total else 0.0
+    print(f"dédoublonnage : {nouveaux} items nouveaux sur {total}, "
+          f"{total - nouveaux} doublons ({ratio:.1%})", file=sys.stderr)
+
+
+# Chaîne en flux : parse, dédoublonnage, filtres et écriture, fichier par fichier
+
+def predicat_filtres(filtres: Dict):
+    """
+    Renvoie la fonction qui teste un item, pour filtrer sans construire d'index sur tout le corpus.
+    """
+    return ReglesFiltres(filtres).garder
+
+
+def filtrer_flux(corpus, filtres: Dict):
+    garder = predicat_filtres(filtres)
+    for file in corpus:
+        items = [item for item in file if garder(item)]
+        if items:
+            yield items
+
+
+def parcours_flux(chemin, method, filtres, workers: int = 1, dedup: bool = False, index_vus=None,
+                  chemin_cache=None, rebuild_cache: bool = False):
+    """
+    Version en flux de parcours_arborescence : renvoie les listes d'items filtrées fichier par fichier,
+    à mesure que les fichiers sont parsés. Seul le fichier en cours est en mémoire.
+    """
+    with mesures.etape("parcours"):
+        files = load_corpus(chemin)
+    cache = CacheParsing(chemin_cache, reconstruire=rebuild_cache) if chemin_cache else None
+    try:
+        flux = mesures.flux("parse", parse_flux(files, method, workers, cache=cache))
+        flux = mesures.flux("filtre", filtrer_flux(flux, filtres))
+        if dedup or index_vus:
+            # après les filtres : seuls les items émis vont dans l'index des empreintes vues
+            flux = mesures.flux("dedoublonnage", dedoublonner_flux(flux, index_vus))
+        for items in flux:
+            mesures.compter("items_sortis", len(items))
+            yield items
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def parcours_arborescence (chemin, method, filtres, workers: int = 1, dedup: bool = False, index_vus=None,
+                           chemin_cache=None, rebuild_cache: bool = False):    # Objet corpus à la place de chemin ?
+    with mesures.etape("parcours"):
+        files = load_corpus(chemin)
+    with mesures.etape("parse"):
+        if chemin_cache:
+            cache = CacheParsing(chemin_cache, reconstruire=rebuild_cache)
+            try:
+                parsed_corpus = parse_files(files, method, workers, cache=cache)
+            finally:
+                cache.close()
+        else:
+            parsed_corpus = parse_files(files, method, workers)
     """
     Maintenant fournis par l'utilisateur et donc gérés dans le main
     filtres = {
@@ -151,7 +511,13 @@ def parcours_arborescence (chemin, method, filtres):    # Objet corpus à la pla
         "source": args.filtre_source
     }
     """
-    data = check_filtres(parsed_corpus, filtres)
+    with mesures.etape("filtre"):
+        data = check_filtres(parsed_corpus, filtres)
+    # le dédoublonnage se fait après les filtres : seuls les items émis vont dans l'index des empreintes vues
+    if dedup or index_vus:
+        with mesures.etape("dedoublonnage"):
+            data = Corpus(items=dedoublonner(data.items, index_vus))
+    mesures.compter("items_sortis", sum(len(items) for items in data.items))
     # for file in data.items:
     #     for item in file:
             #print(f"date : {item['pubDate']}, category : {item['category']}, source = {item['source']}")
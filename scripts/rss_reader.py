@@ -3,62 +3,87 @@
 
 
 import re
+import mmap
 import xml.etree.ElementTree as ET
-import feedparser
 from typing import List
 import os
 from datastructures import Item
 
 
+# Expression régulière compilée une seule fois pour tout le module (sur des bytes, pour lire via mmap) :
+# une seule alternative pour toutes les balises ouvrantes utiles d'un item, la fin de chaque champ
+# étant ensuite trouvée avec find, bien plus rapide qu'un (.*?) paresseux.
+# Le groupe 3 repère une balise auto-fermante (<category domain="..."/>), qui n'a pas de balise fermante
+OUVRANTE_RE = re.compile(rb"<(title|description|pubDate|category)(\s[^>]*?)?\s*(/)?>")
+
+
+def _texte(contenu: bytes) -> str:
+    texte = contenu.decode("utf-8")
+    # même normalisation des fins de ligne qu'une lecture en mode texte
+    if "\r" in texte:
+        texte = texte.replace("\r\n", "\n").replace("\r", "\n")
+    return texte
+
+
+def _champs_item(contenu, debut: int, fin: int, dictionnaire: Item) -> None:
+    """
+    Remplit l'item avec les balises trouvées entre debut et fin, en un seul parcours.
+    """
+    vus = set()
+    position = debut
+    while True:
+        ouvrante = OUVRANTE_RE.search(contenu, position, fin)
+        if ouvrante is None:
+            return
+        balise = ouvrante.group(1)
+        if ouvrante.group(3):
+            # champ vide : chercher sa fin avalerait le texte jusqu'à la balise fermante suivante
+            valeur = b""
+            position = ouvrante.end()
+        else:
+            fermeture = contenu.find(b"</" + balise + b">", ouvrante.end(), fin)
+            if fermeture < 0:
+                return
+            valeur = contenu[ouvrante.end():fermeture]
+            position = fermeture + len(balise) + 3
+        if balise == b"category":
+            # plusieurs catégories possibles, chacune sur une seule ligne
+            if valeur and b"\n" not in valeur:
+                dictionnaire.category.append(_texte(valeur))
+        elif ouvrante.group(2) is None and balise not in vus:
+            # seule la première occurrence de title, description et pubDate compte
+            vus.add(balise)
+            setattr(dictionnaire, balise.decode(), _texte(valeur).strip())
+
+
 def with_re(chemin:str) -> List[Item]:
     nom_fichier = os.path.basename(chemin)
-    
-    # Lecture du contenu du fichier XML
-    with open(chemin, "r") as f:
-        contenu = f.read()
-
-    # Expressions régulières pour extraire les balises <item>
-    item_pattern = r"<item>(.*?)</item>"
-    
-    # Recherche des correspondances dans le contenu
-    items = re.finditer(item_pattern, contenu, re.DOTALL)
     donnees = []
 
-    # Itération sur les correspondances des balises <item>
-    for item in items:
-        titre_match = re.search(r"<title>(.*?)</title>", item.group(1), re.DOTALL)
-        description_match = re.search(r"<description>(.*?)</description>", item.group(1), re.DOTALL)
-        #categorie_match = re.findall(r"<category>(.*?)</category>", item.group(1), re.DOTALL)
-        categorie_match = re.finditer("<category\\s?.*?>(.+?)</category>", item.group(1)) # ligne de correction , ajout plusieurs categories
-        pubdate_match = re.search(r"<pubDate>(.*?)</pubDate>", item.group(1), re.DOTALL)
-        
-        # création du dictionnaire d'item
-        dictionnaire=Item(
-            source="", 
-            title="", 
-            description="", 
-            category=[], 
-            pubDate=""
-            )
-        dictionnaire.source = nom_fichier
-        if titre_match:
-            titre = titre_match.group(1).strip()
-            dictionnaire.title = titre
-        if description_match:
-            description = description_match.group(1).strip()
-            dictionnaire.description = description
-        if categorie_match: 
-            #categorie = categorie_match
-            #dictionnaire["category"] = categorie 
-            for category in categorie_match: #  ligne de correction, ajout plusieurs catégories
-                dictionnaire.category.append(category.group(1)) #  ligne de correction, ajout plusieurs catégories
-        if pubdate_match:
-            pubdate = pubdate_match.group(1).strip()
-            dictionnaire.pubDate = pubdate
-      #  print(categorie)
-            #print(dictionnaire)
-            donnees.append(dictionnaire)
-    
+    # Lecture du fichier XML via mmap : la recherche se fait directement sur la projection
+    with open(chemin, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return donnees
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contenu:
+            # Itération sur les balises <item>
+            position = contenu.find(b"<item>")
+            while position >= 0:
+                debut = position + len(b"<item>")
+                fin = contenu.find(b"</item>", debut)
+                if fin < 0:
+                    break
+                # création du dictionnaire d'item
+                dictionnaire = Item(
+                    source=nom_fichier,
+                    title="",
+                    description="",
+                    category=[],
+                    pubDate=""
+                    )
+                _champs_item(contenu, debut, fin, dictionnaire)
+                donnees.append(dictionnaire)
+                position = contenu.find(b"<item>", fin)
+
     # renvoie la liste de dico d'items
     return donnees
 
@@ -79,8 +104,9 @@ def with_et(chemin):
     
     # création de la liste des items
     liste_totale = []
-    title, description, pubDate = None, None, None
     for element in id_items:
+        # remis à zéro pour chaque item : un item sans titre ou sans date ne reprend pas ceux du précédent
+        title, description, pubDate = None, None, None
         category = []
         if element.find("title") is not None:
             title = element.find("title").text
@@ -90,6 +116,9 @@ def with_et(chemin):
             pubDate = element.find("pubDate").text
         if element.find("category") is not None:
             for nb_category in element.findall("category"):
+                # <category/> vide : aucune catégorie, comme dans with_re
+                if not nb_category.text:
+                    continue
                 category_split = nb_category.text.split(",")
                 for element in category_split:
                     category.append(element)
@@ -107,6 +136,82 @@ def with_et(chemin):
 
 
 
+def _item_element(element, nom_fichier: str) -> Item:
+    """
+    Construit un Item à partir d'un élément <item> en parcourant ses enfants une seule fois.
+    """
+    champs = {"title": None, "description": None, "pubDate": None}
+    category = []
+    for enfant in element:
+        if enfant.tag == "category":
+            if enfant.text:
+                category.extend(enfant.text.split(","))
+        elif enfant.tag in champs and champs[enfant.tag] is None:
+            champs[enfant.tag] = enfant.text
+    return Item(
+        source = nom_fichier,
+        title = champs["title"],
+        description = champs["description"],
+        category = category,
+        pubDate = champs["pubDate"],
+    )
+
+
+_lxml = None
+
+
+def charger_lxml():
+    """
+    Importe lxml à la première lecture avec with_iterparse seulement (False s'il n'est pas installé) :
+    le démarrage des autres lecteurs n'en paie pas le coût.
+    """
+    global _lxml
+    if _lxml is None:
+        try:
+            from lxml import etree
+            _lxml = etree
+        except ImportError:
+            _lxml = False
+    return _lxml
+
+
+def with_iterparse(chemin):
+    """
+    Lit le fichier en flux : chaque <item> est converti dès sa balise fermante puis retiré de l'arbre,
+    la mémoire utilisée ne dépend donc pas de la taille du flux.
+    Utilise le parseur C de lxml s'il est installé, sinon celui de la bibliothèque standard.
+    """
+    nom_fichier = os.path.basename(chemin)
+    liste_totale = []
+    lxml = charger_lxml()
+    erreurs_xml = (ET.ParseError, lxml.XMLSyntaxError) if lxml else (ET.ParseError,)
+    try:
+        if lxml:
+            for _, element in lxml.iterparse(str(chemin), events=("end",), tag="item"):
+                liste_totale.append(_item_element(element, nom_fichier))
+                element.clear()
+                # on supprime aussi les items déjà lus de leur parent
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        else:
+            # ElementTree ne connaît pas le parent d'un élément : la pile des éléments ouverts le donne
+            ouverts = []
+            for evenement, element in ET.iterparse(chemin, events=("start", "end")):
+                if evenement == "start":
+                    ouverts.append(element)
+                    continue
+                ouverts.pop()
+                if element.tag == "item":
+                    liste_totale.append(_item_element(element, nom_fichier))
+                    if ouverts:
+                        ouverts[-1].remove(element)
+    except erreurs_xml:
+        # même comportement que with_et pour un fichier mal formé
+        return []
+    return liste_totale
+
+
+
 def with_feedparser(chemin):
     # lecture du nom du fichier
     nom_fichier = os.path.basename(chemin)
@@ -114,6 +219,9 @@ def with_feedparser(chemin):
     # création de la future liste de dictionnaire d'item
     liste_items = []
     
+    # feedparser n'est importé que si cette méthode est utilisée
+    import feedparser
+
     # récupération de la structure xml du document en chemin
     fichier = feedparser.parse(chemin)
     
@@ -147,4 +255,14 @@ def with_feedparser(chemin):
         liste_items.append(dic_data)
         
     # on retourne la liste de dictionnaires
-    return liste_items
\ No newline at end of file
+    return liste_items
+
+
+
+# Méthodes de lecture disponibles, par nom d'option (-m de read_corpus.py)
+LECTEURS = {
+    "re": with_re,
+    "et": with_et,
+    "fp": with_feedparser,
+    "it": with_iterparse,
+}
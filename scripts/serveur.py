@@ -0,0 +1,167 @@
+import io
+import json
+import pickle
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.request import urlopen
+import rss_parcours
+from cache_parsing import CacheParsing
+from datastructures import Corpus, corpus_to_dict, write_jsonl, write_xml
+
+"""
+Mode serveur de read_corpus.py (ordres serve et client) :
+- ServeurCorpus charge et indexe l'arborescence une seule fois, puis la garde en mémoire
+- un thread surveille l'arborescence et ajoute les fichiers des nouveaux snapshots au corpus et aux index
+- les requêtes de filtrage (dates, source, catégories, format de sortie) arrivent en HTTP sur localhost :
+    GET /requete?dd=2024-01-29&df=2024-02-06&src=bfm&cat=politique&format=json
+- client() envoie une requête au serveur et renvoie la réponse
+"""
+
+HOTE_DEFAUT = "127.0.0.1"
+PORT_DEFAUT = 8765
+
+TYPES_CONTENU = {
+    "json": "application/json; charset=utf-8",
+    "xml": "application/xml; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+    "pickle": "application/octet-stream",
+}
+
+
+class ServeurCorpus:
+    def __init__(self, chemin: str, method: str, workers: int = 1, chemin_cache=None):
+        self.chemin = chemin
+        self.method = method
+        self.workers = workers
+        self.chemin_cache = chemin_cache
+        self.verrou = threading.Lock()
+        self.fichiers = set()
+        self.corpus = []
+        self.index = rss_parcours.IndexCorpus([])
+        self.mise_a_jour()
+
+    def mise_a_jour(self) -> int:
+        """
+        Parse les fichiers apparus depuis le dernier passage et les ajoute au corpus et aux index.
+        Renvoie le nombre de nouveaux fichiers.
+        """
+        nouveaux = [f for f in rss_parcours.load_corpus(self.chemin) if f not in self.fichiers]
+        if not nouveaux:
+            return 0
+        if self.chemin_cache:
+            cache = CacheParsing(self.chemin_cache)
+            try:
+                parsed = rss_parcours.parse_files(nouveaux, self.method, self.workers, cache=cache)
+            finally:
+                cache.close()
+        else:
+            parsed = rss_parcours.parse_files(nouveaux, self.method, self.workers)
+        with self.verrou:
+            # l'index doit être mis à jour avec les mêmes numéros d'items que le corpus
+            self.corpus.extend(parsed)
+            self.index.ajouter(parsed)
+            self.fichiers.update(nouveaux)
+        return len(nouveaux)
+
+    def surveiller(self, intervalle: float) -> None:
+        while True:
+            time.sleep(intervalle)
+            nb = self.mise_a_jour()
+            if nb:
+                print(f"{nb} nouveaux fichiers ajoutés au corpus", file=sys.stderr)
+
+    def requete(self, filtres: Dict, format_sortie: str) -> bytes:
+        with self.verrou:
+            # copie de la liste des fichiers : sans filtre, check_filtres renvoie la liste elle-même, que le thread
+            # de surveillance peut compléter pendant la sérialisation (faite hors du verrou)
+            corpus = rss_parcours.check_filtres(list(self.corpus), filtres, self.index)
+        return serialiser(corpus, format_sortie)
+
+
+def serialiser(corpus: Corpus, format_sortie: str) -> bytes:
+    if format_sortie == "xml":
+        sortie = io.StringIO()
+        write_xml(corpus.items, sortie)
+        return sortie.getvalue().encode("utf-8")
+    if format_sortie == "jsonl":
+        sortie = io.StringIO()
+        write_jsonl(corpus.items, sortie)
+        return sortie.getvalue().encode("utf-8")
+    if format_sortie == "pickle":
+        return pickle.dumps(corpus)
+    return json.dumps(corpus_to_dict(corpus), ensure_ascii=False).encode("utf-8")
+
+
+def filtres_requete(parametres: Dict) -> Dict:
+    """
+    Construit le dictionnaire des filtres (même forme que dans read_corpus.py) à partir des paramètres de l'URL.
+    """
+    def valeur(cle):
+        return parametres.get(cle, [""])[0]
+    return {
+        "categories": valeur("cat").split(),
+        "source": valeur("src"),
+        "date": [valeur("dd"), valeur("df")],
+    }
+
+
+def gestionnaire(serveur_corpus: ServeurCorpus):
+    class Gestionnaire(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/requete":
+                self.send_error(404, "Utiliser /requete?dd=&df=&src=&cat=&format=")
+                return
+            parametres = parse_qs(url.query)
+            format_sortie = parametres.get("format", ["json"])[0]
+            if format_sortie not in TYPES_CONTENU:
+                self.send_error(400, "Format non reconnu : json, xml, jsonl ou pickle")
+                return
+            try:
+                contenu = serveur_corpus.requete(filtres_requete(parametres), format_sortie)
+            except ValueError as erreur:
+                # date mal formée
+                self.send_error(400, str(erreur))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", TYPES_CONTENU[format_sortie])
+            self.send_header("Content-Length", str(len(contenu)))
+            self.end_headers()
+            self.wfile.write(contenu)
+
+        def log_message(self, format, *args):
+            # journal sur la sortie d'erreur seulement, comme les autres rapports
+            print(format % args, file=sys.stderr)
+
+    return Gestionnaire
+
+
+def serve(chemin: str, method: str, hote: str = HOTE_DEFAUT, port: int = PORT_DEFAUT,
+          workers: int = 1, chemin_cache=None, intervalle: float = 60.0) -> None:
+    serveur_corpus = ServeurCorpus(chemin, method, workers, chemin_cache)
+    if intervalle > 0:
+        threading.Thread(target=serveur_corpus.surveiller, args=(intervalle,), daemon=True).start()
+    serveur = ThreadingHTTPServer((hote, port), gestionnaire(serveur_corpus))
+    print(f"corpus de {serveur_corpus.index.nb_items} items servi sur http://{hote}:{port}/requete", file=sys.stderr)
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+
+
+def client(filtres: Dict, format_sortie: str = "json", hote: str = HOTE_DEFAUT, port: int = PORT_DEFAUT) -> bytes:
+    parametres = {
+        "dd": filtres["date"][0],
+        "df": filtres["date"][1],
+        "src": filtres["source"],
+        "cat": " ".join(filtres["categories"]),
+        "format": format_sortie,
+    }
+    with urlopen(f"http://{hote}:{port}/requete?{urlencode(parametres)}") as reponse:
+        return reponse.read()
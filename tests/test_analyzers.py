@@ -0,0 +1,86 @@
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from analyzers import (annoter_listes, flux_spacy, flux_trankit, item_annote, item_trankit, paquet_trankit,
+                       texte_spacy, tokens_spacy)
+from benchmarks import ModeleFactice
+from datastructures import Item
+
+"""
+L'annotation par paquets (un seul appel au modèle pour plusieurs items) doit donner les mêmes tokens
+que l'annotation item par item : chaque phrase revient à son item, y compris autour des items sans
+description, et annoter_listes rend une liste annotée (vide au besoin) par liste d'items lue.
+"""
+
+
+class ModelePhrases(ModeleFactice):
+    # comme ModeleFactice, mais chaque paragraphe est aussi découpé en phrases (après ". "),
+    # pour que les items de plusieurs phrases passent par le rattachement des phrases aux items
+    def __call__(self, texte):
+        phrases = []
+        for morceau in re.finditer(r"[^\n]+?(?:\. |$)|\n+", texte, re.MULTILINE):
+            if morceau.group().strip():
+                for phrase in ModeleFactice.__call__(self, morceau.group())["sentences"]:
+                    debut, fin = phrase["dspan"]
+                    phrases.append(dict(phrase, dspan=(morceau.start() + debut, morceau.start() + fin)))
+        return {"sentences": phrases}
+
+
+ITEMS = [
+    Item("a.xml", "Premier titre", "Une phrase. Puis une autre phrase. Et une dernière.", ["Monde"], ""),
+    Item("a.xml", "Sans description", "", [], ""),
+    Item("b.xml", "Description blanche", "   \n\n  ", [], ""),
+    Item("b.xml", None, "Paragraphe un.\n\nParagraphe deux. Suite du paragraphe deux.", [], ""),
+    Item("c.xml", "Dernier titre", "Une seule phrase", ["Sport"], ""),
+]
+
+LISTES = [[], ITEMS[:2], [], [], ITEMS[2:3], ITEMS[3:], []]
+
+
+def test_paquet_trankit_comme_item_trankit():
+    nlp = ModelePhrases()
+    attendus = [item_trankit(item, nlp) for item in ITEMS]
+    assert all(item.analysis for item in attendus)
+    assert paquet_trankit(ITEMS, nlp) == attendus
+    # le découpage en paquets ne change pas le rattachement des phrases
+    for taille in (1, 2, 3):
+        assert list(flux_trankit(ITEMS, nlp, batch_size=taille)) == attendus
+
+
+def test_annoter_listes_trankit_avec_listes_vides():
+    nlp = ModelePhrases()
+
+    def annoter(items, batch_size, n_process, cache):
+        return flux_trankit(items, nlp, batch_size=batch_size, cache=cache)
+
+    for taille in (1, 2, 4):
+        annotees = list(annoter_listes(iter(LISTES), annoter, taille, 1))
+        assert annotees == [[item_trankit(item, nlp) for item in item_list] for item_list in LISTES]
+
+
+def test_annoter_listes_spacy_avec_listes_vides():
+    nlp = ModeleFactice()
+
+    def annoter(items, batch_size, n_process, cache):
+        return flux_spacy(items, nlp, batch_size, n_process, cache)
+
+    def annoter_un(item):
+        # ModeleFactice n'imite spaCy que par pipe
+        return item_annote(item, tokens_spacy(next(nlp.pipe([texte_spacy(item)]))))
+
+    annotees = list(annoter_listes(iter(LISTES), annoter, 2, 1))
+    assert annotees == [[annoter_un(item) for item in item_list] for item_list in LISTES]
+    assert list(annoter_listes(iter([[], []]), annoter, 2, 1)) == [[], []]
+
+
+def test_racine_trankit_pointe_sur_elle_meme():
+    nlp = ModelePhrases()
+    for item in paquet_trankit(ITEMS, nlp):
+        racines = [position for position, token in enumerate(item.analysis) if token.Gouv_id == position]
+        assert racines
+        for token in item.analysis:
+            gouverneur = item.analysis[token.Gouv_id]
+            assert (token.Gouv_lemme, token.Gouv_pos) == (gouverneur.Lemma, gouverneur.POS)
@@ -0,0 +1,65 @@
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from datastructures import Corpus, Item, Token, compacter, load_pickle
+
+"""
+Les corpus pickle écrits avant le passage de Item et Token en slots=True doivent toujours se charger,
+et les vues de tokens (VueTokens) se comparent comme des listes.
+"""
+
+# Corpus(items=[[Item(..., analysis=[Token(...)])]]) picklé (protocole 4) avec le datastructures.py d'origine :
+# Item et Token sans slots, Token sans Gouv_id
+PICKLE_ANCIEN = (
+    b'\x80\x04\x95K\x01\x00\x00\x00\x00\x00\x00\x8c\x0edatastructures\x94\x8c\x06Corpus\x94\x93\x94)\x81\x94}\x94'
+    b'\x8c\x05items\x94]\x94]\x94h\x00\x8c\x04Item\x94\x93\x94)\x81\x94}\x94(\x8c\x06source\x94\x8c\x0cle_monde.xml'
+    b'\x94\x8c\x05title\x94\x8c\x05Titre\x94\x8c\x0bdescription\x94\x8c\x04Desc\x94\x8c\x08category\x94]\x94\x8c\t'
+    b'Politique\x94a\x8c\x07pubDate\x94\x8c\x1fMon, 01 Jan 2024 10:00:00 +0100\x94\x8c\x08analysis\x94]\x94h\x00'
+    b'\x8c\x05Token\x94\x93\x94)\x81\x94}\x94(\x8c\x04Form\x94\x8c\x05chats\x94\x8c\x05Lemma\x94\x8c\x04chat\x94'
+    b'\x8c\x03POS\x94\x8c\x04NOUN\x94\x8c\nGouv_lemme\x94\x8c\x06manger\x94\x8c\x08Gouv_pos\x94\x8c\x04VERB\x94'
+    b'\x8c\x03Rel\x94\x8c\x05nsubj\x94ubaubaasb.'
+)
+
+CORPUS_ATTENDU = Corpus(items=[[Item("le_monde.xml", "Titre", "Desc", ["Politique"], "Mon, 01 Jan 2024 10:00:00 +0100",
+                                     [Token("chats", "chat", "NOUN", "manger", "VERB", "nsubj")])]])
+
+
+def test_load_pickle_ancien_format():
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = Path(dossier) / "ancien.pkl"
+        chemin.write_bytes(PICKLE_ANCIEN)
+        corpus = load_pickle(chemin)
+    assert corpus == CORPUS_ATTENDU
+    assert corpus.items[0][0].analysis[0].Gouv_id is None
+
+
+def test_pickle_aller_retour():
+    token = Token("chats", "chat", "NOUN", "manger", "VERB", "nsubj", 1)
+    corpus = Corpus(items=[[Item("src", "t", "d", ["c"], "p", [token])]])
+    for protocole in range(pickle.HIGHEST_PROTOCOL + 1):
+        assert pickle.loads(pickle.dumps(corpus, protocol=protocole)) == corpus
+
+
+def test_etat_slots():
+    # format (None, slots) produit par défaut pour une classe à slots sans __getstate__
+    token = Token.__new__(Token)
+    token.__setstate__((None, {"Form": "a", "Lemma": "b", "POS": "c", "Gouv_lemme": "d", "Gouv_pos": "e", "Rel": "f"}))
+    assert token == Token("a", "b", "c", "d", "e", "f")
+
+
+def test_vue_tokens_comparee_a_un_item_non_annote():
+    tokens = [Token("chats", "chat", "NOUN", "manger", "VERB", "nsubj", 1),
+              Token("mangent", "manger", "VERB", "manger", "VERB", "root", 1)]
+    annote = Item("src", "t", "d", ["c"], "p", list(tokens))
+    compacter(Corpus(items=[[annote]]))
+    non_annote = Item("src", "t", "d", ["c"], "p")
+    assert annote != non_annote
+    assert non_annote != annote
+    assert annote.analysis != 3
+    assert annote.analysis == tokens
+    assert tokens == annote.analysis
+    assert annote.analysis == tuple(tokens)
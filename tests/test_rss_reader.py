@@ -0,0 +1,54 @@
+import re
+import sys
+from pathlib import Path
+from xml.sax.saxutils import unescape
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import rss_reader
+
+"""
+Le lecteur par expressions régulières (with_re) doit lire les mêmes items que ElementTree (with_et)
+sur flux_test.xml : balises auto-fermantes, item sans pubDate, plusieurs catégories, fins de ligne CRLF
+et description contenant du texte qui ressemble à des balises.
+"""
+
+FLUX_TEST = Path(__file__).resolve().parent / "flux_test.xml"
+CDATA_RE = re.compile(r"<!\[CDATA\[(.*?)\]\]>", re.S)
+
+
+def normaliser(texte):
+    # with_re renvoie le texte brut du fichier (CDATA et entités compris, sans espaces autour),
+    # with_et le texte analysé (None pour un champ absent ou vide)
+    if texte is None:
+        return ""
+    return unescape(CDATA_RE.sub(r"\1", texte)).strip()
+
+
+def champs(item):
+    return (item.source, normaliser(item.title), normaliser(item.description),
+            [normaliser(category) for category in item.category], normaliser(item.pubDate))
+
+
+def test_fixture_crlf():
+    assert b"\r\n" in FLUX_TEST.read_bytes()
+
+
+def test_with_re_comme_with_et():
+    items_re = rss_reader.with_re(FLUX_TEST)
+    items_et = rss_reader.with_et(FLUX_TEST)
+    assert len(items_re) == 6
+    assert [champs(item) for item in items_re] == [champs(item) for item in items_et]
+
+
+def test_with_re_cas_limites():
+    items = rss_reader.with_re(FLUX_TEST)
+    # la catégorie auto-fermante n'avale pas le titre et la catégorie qui la suivent
+    assert items[0].title == "Titre avec une catégorie auto-fermante avant lui"
+    assert items[0].category == ["Politique"]
+    assert items[1].pubDate == ""
+    assert items[3].description == "Première ligne\ndeuxième ligne\ntroisième ligne"
+    # les fausses balises de la description ne sont lues ni comme titre ni comme catégorie
+    assert items[4].title == "Texte qui ressemble à des balises"
+    assert items[4].category == ["Médias"]
+    assert items[5].description == "" and items[5].category == []